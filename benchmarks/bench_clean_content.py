@@ -0,0 +1,65 @@
+# clean_content 基準測試：比較單次逐行引擎與舊版多次掃描實作
+# 用法: python benchmarks/bench_clean_content.py [--notes 20] [--paragraphs 5000] [--repeat 5]
+# 兩者交替量測、各取最佳值，降低機器負載變化的影響；輸出一致性的完整檢查見 check_clean_content.py
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import notion_to_obsidian_bulk as converter
+from legacy_clean_content import clean_content as legacy_clean_content
+
+def make_note(rng, paragraphs):
+    hex_id = lambda: ''.join(rng.choice('0123456789abcdef') for _ in range(32))
+    lines = ["# Project Notes", "", "Status: In Progress", "Owner: Alice", "Date: 2024/05/01 10:00", "Tags: work, notes", ""]
+    for i in range(paragraphs):
+        kind = i % 5
+        if kind == 0:
+            lines += ["| Name | Value |", "|---|---|", "| broken", "cell | 1 |", "| ok | 2 |"]
+        elif kind == 1:
+            lines.append(f"See [Page {i}](Sub%20Page%20{hex_id()}/Page%20{i}%20{hex_id()}.md) and [site](https://example.com/{i}).")
+        elif kind == 2:
+            lines += ["```python", "| not a table", "x = 1", "```"]
+        elif kind == 3:
+            lines += ["> 💡 remember this", "> **⚠️** careful"]
+        else:
+            lines.append("Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor. " * 2)
+    return "\n".join(lines) + "\n"
+
+def timed(func, notes):
+    # 清空連結快取，只計入單次轉換內的重複連結
+    converter.rewrite_link_url.cache_clear()
+    start = time.perf_counter()
+    for note in notes: func(note)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="clean_content 基準測試")
+    parser.add_argument('--notes', type=int, default=20, help="筆記數量")
+    parser.add_argument('--paragraphs', type=int, default=5000, help="每篇筆記的段落數 (大型筆記)")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    notes = [make_note(rng, args.paragraphs) for _ in range(args.notes)]
+    total_mb = sum(len(n.encode('utf-8')) for n in notes) / 1024 / 1024
+    for note in notes:
+        if converter.clean_content(note) != legacy_clean_content(note):
+            print("輸出不一致！"); sys.exit(1)
+
+    legacy = current = None
+    for _ in range(args.repeat):
+        elapsed = timed(legacy_clean_content, notes)
+        legacy = elapsed if legacy is None else min(legacy, elapsed)
+        elapsed = timed(converter.clean_content, notes)
+        current = elapsed if current is None else min(current, elapsed)
+    print(f"資料量: {args.notes} 篇 / {total_mb:.1f} MB (輸出一致)")
+    print(f"舊版多次掃描: {legacy:.3f}s ({total_mb / legacy:.1f} MB/s)")
+    print(f"單次逐行引擎: {current:.3f}s ({total_mb / current:.1f} MB/s)")
+    print(f"加速: {legacy / current:.2f}x")
+
+if __name__ == "__main__":
+    main()
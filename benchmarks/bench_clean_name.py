@@ -0,0 +1,68 @@
+# get_clean_name 微基準測試：比較快取 + 預先編譯的名稱清洗與舊版每次呼叫 re.sub 的實作
+# 用法: python benchmarks/bench_clean_name.py [--links 1000000] [--names 5000]
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import notion_to_obsidian_bulk as converter
+from generate_export import WORDS, hex_id
+
+def legacy_clean_name(name):
+    # 舊版實作：每次呼叫都以字串樣式執行 re.sub
+    pattern = r" [0-9a-f]{32}"
+    return re.sub(pattern, "", name)
+
+def make_links(rng, count, names):
+    # 連結路徑由 1-4 段組成，各段取自有限的頁面名稱集合 (與實際匯出相同，同一資料夾會在大量連結中重複出現)
+    pool = [f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {i} {hex_id(rng)}" for i in range(names)]
+    pool += ["image.png", "..", "Untitled"]
+    links = []
+    for _ in range(count):
+        parts = [rng.choice(pool) for _ in range(rng.randint(1, 4))]
+        parts[-1] += ".md"
+        links.append(parts)
+    return links
+
+def timed(func, links, repeat):
+    best = None
+    for _ in range(repeat):
+        converter._clean_name.cache_clear()
+        start = time.perf_counter()
+        for parts in links:
+            for part in parts: func(part)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="get_clean_name 微基準測試")
+    parser.add_argument('--links', type=int, default=1000000, help="連結數量")
+    parser.add_argument('--names', type=int, default=5000, help="不重複的頁面名稱數")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    links = make_links(rng, args.links, args.names)
+    segments = sum(len(parts) for parts in links)
+    for parts in links[:10000]:
+        for part in parts:
+            if converter.get_clean_name(part) != legacy_clean_name(part):
+                print("輸出不一致！"); sys.exit(1)
+
+    legacy = timed(legacy_clean_name, links, args.repeat)
+    current = timed(converter.get_clean_name, links, args.repeat)
+    info = converter._clean_name.cache_info()
+    print(f"資料量: {args.links} 個連結 / {segments} 個路徑片段 / {args.names} 個不重複名稱 (輸出一致)")
+    print(f"舊版 re.sub: {legacy:.3f}s ({segments / legacy / 1e6:.2f} M 片段/s)")
+    print(f"快取版本: {current:.3f}s ({segments / current / 1e6:.2f} M 片段/s)")
+    print(f"快取命中率: {info.hits / max(1, info.hits + info.misses):.2%} (命中 {info.hits}，未命中 {info.misses})")
+    print(f"加速: {legacy / current:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# clean_content 隨機差異測試：以邊界案例隨機組成筆記，比對單次逐行引擎與舊版多次掃描實作的輸出
+# 用法: python benchmarks/check_clean_content.py [--cases 30000] [--seed 0]
+# 涵蓋 enable_yaml / fix_tables 的所有組合，並以小批次執行大型筆記的串流路徑；不一致時印出該筆輸入並以結束代碼 1 結束
+# link_style=wikilink 的輸出與舊版格式不同，另檢查表格列中的 [[頁面|顯示文字]] 沒有未跳脫的 | (不可分割儲存格)
+import argparse
+import itertools
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import notion_to_obsidian_bulk as converter
+from legacy_clean_content import clean_content as legacy_clean_content
+
+# 各轉換的觸發與容易出錯的邊界：標題、屬性、Tags (含單獨一行)、Callout、表格斷行、Code / Math 區塊、連結與 --- 區塊
+TOKENS = [
+    "# Title", "# ", "# T2", "##  x", "", " ", "text", "mid | pipe",
+    "Key: val", "Date: 1:2", "k: #x", "Status: Done", "https://x: y", "Name: " + "x" * 60, "x" * 60 + ": v", 'a: "q"',
+    "Tags:", "Tags: a, b", "Tags:  ", "Tags: ", "Tags:\t x", "Tags:　a", "Tags:x",
+    "> 💡 hi", "> **⚠️** w", "> ℹ️", "> **🔥", "> ",
+    "| a | b |", "| a", "b |", "  | c", "```", "``` py", "$$", " $$ ",
+    "[l](Page%20abcdef0123456789abcdef0123456789.md)", "[x](about:blank)", "[y](DB 0123456789abcdef0123456789abcdef_all.csv)",
+    "[z](https://a b)", "[a](b", "c)", "---", "---",
+    "| a | [see](Page%20abcdef0123456789abcdef0123456789.md) |", "| [s](Other%200123456789abcdef0123456789abcdef.md#Sec) |",
+    " | [Page](Page%20abcdef0123456789abcdef0123456789.md) | b |", "[s](Other%200123456789abcdef0123456789abcdef.md#Sec)",
+]
+
+# 未跳脫的 |，即表格儲存格的分隔
+CELL_SEPARATOR = re.compile(r'(?<!\\)\|')
+WIKILINK = re.compile(r'\[\[(.*?)\]\]')
+
+def random_note(rng):
+    note = "\n".join(rng.choice(TOKENS) for _ in range(rng.randint(0, 12)))
+    return note + "\n" if rng.random() < 0.3 else note
+
+def stream_content(note):
+    # clean_stream 使用的逐批輸出，批次設為 3 行以涵蓋 YAML 區塊決定前後的切換
+    return '\n'.join(itertools.chain.from_iterable(converter.clean_lines(note.split('\n'), batch=3)))
+
+def split_table_links(text):
+    # 回傳表格列 (去除開頭空白後以 | 開頭) 中含有未跳脫 | 的 wikilink
+    return [link for line in text.split('\n') if line.lstrip().startswith('|') for link in WIKILINK.findall(line) if CELL_SEPARATOR.search(link)]
+
+def main():
+    parser = argparse.ArgumentParser(description="clean_content 隨機差異測試")
+    parser.add_argument('--cases', type=int, default=30000, help="每種設定組合的筆記數")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # 空的連結索引：所有連結依名稱推得目標，wikilink 模式也會產生 [[目標|顯示文字]]
+    wikilink = converter.LinkIndex('', [])
+    for enable_yaml, fix_tables in itertools.product((True, False), repeat=2):
+        converter.SETTINGS.update({'enable_yaml': enable_yaml, 'fix_tables': fix_tables})
+        for _ in range(args.cases):
+            note = random_note(rng)
+            expected = legacy_clean_content(note)
+            for name, actual in (('clean_content', converter.clean_content(note)), ('串流路徑', stream_content(note))):
+                if actual != expected:
+                    print(f"輸出不一致 ({name}, enable_yaml={enable_yaml}, fix_tables={fix_tables})")
+                    print(f"輸入: {note!r}\n新版: {actual!r}\n舊版: {expected!r}")
+                    sys.exit(1)
+            converter.SETTINGS['link_style'] = 'wikilink'
+            try: actual = converter.clean_content(note, wikilink.replacer('note.md')[0])
+            finally: converter.SETTINGS['link_style'] = converter.DEFAULT_SETTINGS['link_style']
+            if split_table_links(actual):
+                print(f"表格列中的 wikilink 分割了儲存格 (enable_yaml={enable_yaml}, fix_tables={fix_tables})")
+                print(f"輸入: {note!r}\n輸出: {actual!r}")
+                sys.exit(1)
+    print(f"{args.cases * 4} 篇隨機筆記的輸出皆與舊版一致")
+
+if __name__ == "__main__":
+    main()
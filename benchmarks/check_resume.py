@@ -0,0 +1,124 @@
+# 續傳 (--resume) 的中斷注入檢查：在轉換的第 N 次呼叫某個函式時中止，再以續傳完成，結果須與未中斷的轉換完全相同
+# 用法: python benchmarks/check_resume.py [--pages 300] [--points 4] [--csv-modes links,dataview] [--modes extract,stream]
+# 比對 vault 中每個檔案的內容；extract 模式另比對修改的筆記數與錯誤日誌 (串流模式的續傳為增量轉換，只回報本次更新的項目)
+# 任何不一致時以結束代碼 1 結束
+import argparse
+import contextlib
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import notion_to_obsidian_bulk as converter
+from generate_export import generate_export
+
+# 各模式的注入點：模組函式名稱，或 os.replace / os.rename (日誌記錄後的暫存檔取代、改名、CSV 合併與資料列屬性寫入)
+TARGETS = {
+    'extract': ('convert_csv_to_md', 'repair_markdown_file', 'os.rename', 'os.replace'),
+    'stream': ('stream_unit', 'os.replace'),
+}
+
+class Crash(BaseException):
+    # 不是 Exception 的子類別，轉換流程中的 except Exception 不會攔截，等同行程在該處被中止
+    pass
+
+def configure(csv_mode, mode):
+    # 不讀取 config.ini；workers 為 1，注入點才會在主行程中被呼叫
+    converter.SETTINGS.update(converter.DEFAULT_SETTINGS)
+    converter.SETTINGS.update({'csv_mode': csv_mode, 'stream_convert': mode == 'stream', 'workers': 1, 'checkpoint': True, 'auto_zip': False, 'open_folder': False})
+    converter.STATS.reset()
+
+def convert(zip_path, target_dir, resume=False):
+    # 轉換過程的訊息不輸出，只列出檢查結果
+    errors = []
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        result = converter.run_conversion(zip_path, target_dir, errors, resume)
+    return (None if result is None else result[0]), sorted(errors)
+
+def patch(target, hook):
+    # 在每次呼叫注入目標前執行 hook，回傳還原函式
+    owner, name = (os, target[3:]) if target.startswith('os.') else (converter, target)
+    original = getattr(owner, name)
+    def wrapper(*args, **kwargs):
+        hook()
+        return original(*args, **kwargs)
+    setattr(owner, name, wrapper)
+    return lambda: setattr(owner, name, original)
+
+def tree_diff(a, b):
+    # 回傳兩個資料夾中不存在於另一方或內容不同的檔案
+    cmp = filecmp.dircmp(a, b, ignore=[])
+    diff = cmp.left_only + cmp.right_only + [f for f in cmp.common_files if not filecmp.cmp(os.path.join(a, f), os.path.join(b, f), shallow=False)]
+    diff = [os.path.join(os.path.relpath(a), name) for name in diff]
+    for sub in cmp.common_dirs: diff += tree_diff(os.path.join(a, sub), os.path.join(b, sub))
+    return diff
+
+def crash_points(total, points):
+    # 第一次呼叫與平均分布於整個轉換過程的呼叫
+    return sorted({1} | {max(1, total * (i + 1) // (points + 1)) for i in range(points)}) if total else []
+
+def check_mode(zip_path, workdir, mode, csv_mode, points):
+    # 回傳失敗的項目數
+    ref_dir = os.path.join(workdir, 'ref', 'vault')
+    run_root = os.path.join(workdir, 'run')
+    run_dir = os.path.join(run_root, 'vault')
+    shutil.rmtree(os.path.dirname(ref_dir), ignore_errors=True)
+    configure(csv_mode, mode)
+    calls = {target: 0 for target in TARGETS[mode]}
+    def counter(target):
+        def hook(): calls[target] += 1
+        return hook
+    restores = [patch(target, counter(target)) for target in calls]
+    try: expected = convert(zip_path, ref_dir)
+    finally:
+        for restore in reversed(restores): restore()
+
+    failures = 0
+    for target, total in calls.items():
+        for k in crash_points(total, points):
+            shutil.rmtree(run_root, ignore_errors=True)
+            configure(csv_mode, mode)
+            count = [0]
+            def hook():
+                count[0] += 1
+                if count[0] == k: raise Crash()
+            restore = patch(target, hook)
+            try: convert(zip_path, run_dir); crashed = False
+            except Crash: crashed = True
+            finally: restore()
+            configure(csv_mode, mode)
+            actual = convert(zip_path, run_dir, resume=True)
+            diff = tree_diff(ref_dir, run_dir)
+            ok = not diff and (mode == 'stream' or actual == expected)
+            failures += not ok
+            status = 'OK' if ok else f"失敗: 修改數 {actual[0]} / {expected[0]}，錯誤 {len(actual[1])} / {len(expected[1])}，不同的檔案 {diff[:5]}"
+            print(f"{mode:<8}{csv_mode:<10}{target:<22}第 {k:>4}/{total} 次呼叫{'中斷' if crashed else '未中斷'}  {status}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="續傳的中斷注入檢查")
+    parser.add_argument('--pages', type=int, default=300, help="模擬匯出的頁面數")
+    parser.add_argument('--points', type=int, default=4, help="每個注入點平均分布的中斷次數 (另加第一次呼叫)")
+    parser.add_argument('--csv-modes', default='links,dataview')
+    parser.add_argument('--modes', default='extract,stream')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='n2o_resume_')
+    failures = 0
+    try:
+        zip_path = os.path.join(workdir, 'export.zip')
+        generate_export(zip_path, args.pages, args.seed)
+        for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+            for csv_mode in [m.strip() for m in args.csv_modes.split(',') if m.strip()]:
+                failures += check_mode(zip_path, workdir, mode, csv_mode, args.points)
+    finally: shutil.rmtree(workdir, ignore_errors=True)
+    print(f"共 {failures} 項不一致" if failures else "所有中斷點續傳後的結果皆與未中斷的轉換相同")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# 產生模擬的 Notion 匯出 ZIP (Markdown & CSV)，供基準測試使用
+# 用法: python benchmarks/generate_export.py export.zip --pages 10000
+import argparse
+import os
+import random
+import tempfile
+import urllib.parse
+import zipfile
+
+WORDS = ("notion obsidian vault page note project task meeting design review draft "
+         "roadmap budget research summary idea weekly report 專案 會議 筆記 設計 整理").split()
+
+def hex_id(rng):
+    return '%032x' % rng.getrandbits(128)
+
+def link_path(path):
+    return urllib.parse.quote(path)
+
+def sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+def make_page(rng, title, links, image=None, long_note=False, properties=None):
+    lines = [f"# {title}", ""]
+    if properties is None and rng.random() < 0.6:
+        properties = {"Status": rng.choice(["Done", "In Progress", "Todo"]), "Created": "2024/05/01 10:00", "Owner": rng.choice(WORDS)}
+    for key, value in (properties or {}).items(): lines.append(f"{key}: {value}")
+    if rng.random() < 0.4: lines.append("Tags: " + ", ".join(rng.sample(WORDS, 3)))
+    lines.append("")
+    blocks = rng.randint(40, 120) if long_note else rng.randint(3, 12)
+    for i in range(blocks):
+        kind = rng.random()
+        if kind < 0.35:
+            lines.append(sentence(rng, rng.randint(8, 40)))
+        elif kind < 0.55 and links:
+            target, label = rng.choice(links)
+            lines.append(f"See [{label}]({link_path(target)}) and [docs](https://example.com/{rng.choice(WORDS)}).")
+        elif kind < 0.65:
+            # 內容含換行而破碎的表格列
+            lines += ["| Name | Value | Note |", "|---|---|---|", f"| {rng.choice(WORDS)} | first line", "second line | ok |", f"| {rng.choice(WORDS)} | 1 | 2 |"]
+        elif kind < 0.72:
+            lines += ["```python", "| not a table", "value = compute()", "```"]
+        elif kind < 0.77:
+            lines += ["$$", "| x |", "$$"]
+        elif kind < 0.85:
+            lines.append(rng.choice(["> 💡 ", "> **⚠️** ", "> ℹ️ "]) + sentence(rng))
+        else:
+            lines.append("- " + sentence(rng, 6))
+    if image: lines.append(f"![image]({link_path(image)})")
+    return "\n".join(lines) + "\n"
+
+def generate_export(zip_path, pages, seed=0, long_ratio=0.02, image_ratio=0.1, db_ratio=0.05):
+    # 回傳實際產生的頁面數與檔案數；外層 ZIP 內含一個 Export-*-Part-1.zip，與 Notion 大型匯出相同
+    rng = random.Random(seed)
+    inner_fd, inner_path = tempfile.mkstemp(suffix='.zip')
+    os.close(inner_fd)
+    count = {'pages': 0, 'files': 0}
+    try:
+        with zipfile.ZipFile(inner_path, 'w', zipfile.ZIP_DEFLATED) as inner:
+            def write(path, data):
+                inner.writestr(path, data)
+                count['files'] += 1
+            # (資料夾路徑, 深度)；每個頁面可能有子頁面資料夾，形成深層樹狀結構
+            queue = [("", 0)]
+            while queue and count['pages'] < pages:
+                folder, depth = queue.pop(0)
+                children = [f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {i}" for i in range(rng.randint(3, 8))]
+                names = [f"{title} {hex_id(rng)}" for title in children]
+                sibling_links = [(f"{name}.md", title) for name, title in zip(names, children)]
+                for title, name in zip(children, names):
+                    if count['pages'] >= pages: break
+                    sub = folder + name
+                    links = sibling_links + [(f"{name}/{t} {hex_id(rng)}.md", t) for t in rng.sample(WORDS, 2)]
+                    if depth: links.append((f"../{rng.choice(WORDS)} {hex_id(rng)}.md", "parent"))
+                    image = None
+                    if rng.random() < image_ratio:
+                        image = f"{name}/{rng.choice(WORDS)} {hex_id(rng)}.png"
+                        size = rng.randint(2000, 40000)
+                        write(folder + image, rng.getrandbits(size * 8).to_bytes(size, 'little'))
+                    write(sub + ".md", make_page(rng, title, links, image, rng.random() < long_ratio))
+                    count['pages'] += 1
+                    if rng.random() < db_ratio:
+                        # Database：CSV、_all.csv 變體與每列一頁的資料夾
+                        db = f"{title} DB {hex_id(rng)}"
+                        rows = []
+                        for r in range(rng.randint(5, 40)):
+                            row_title = f"{rng.choice(WORDS)} {r}"
+                            props = {"Status": rng.choice(["Done", "Todo"]), "Priority": rng.choice(["High", "Low"]), "Owner": rng.choice(WORDS)}
+                            rows.append((row_title, props))
+                            write(f"{sub}/{db}/{row_title} {hex_id(rng)}.md", make_page(rng, row_title, [], properties=props))
+                            count['pages'] += 1
+                        header = "Name,Status,Priority,Owner\n"
+                        lines = [f"{t},{p['Status']},{p['Priority']},{p['Owner']}\n" for t, p in rows]
+                        # 目前檢視只含部分資料列，_all.csv 為完整版本
+                        write(f"{sub}/{db}.csv", header + "".join(lines[: len(lines) // 2]))
+                        write(f"{sub}/{db}_all.csv", header + "".join(lines))
+                    if depth < 12 and rng.random() < 0.5: queue.append((sub + "/", depth + 1))
+                if not queue and count['pages'] < pages: queue.append((folder, depth))
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as outer:
+            outer.write(inner_path, f"Export-{hex_id(rng)}-Part-1.zip")
+    finally: os.remove(inner_path)
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="產生模擬的 Notion 匯出 ZIP")
+    parser.add_argument('zip_path')
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    count = generate_export(args.zip_path, args.pages, args.seed)
+    print(f"已產生 {count['pages']} 頁 / {count['files']} 個檔案: {args.zip_path}")
+
+if __name__ == "__main__":
+    main()
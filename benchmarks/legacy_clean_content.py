@@ -0,0 +1,104 @@
+# 舊版多次掃描的 clean_content (v2.0)，僅供基準測試比對輸出與速度
+import re
+import urllib.parse
+
+from notion_to_obsidian_bulk import SETTINGS, get_clean_name
+
+def process_tags(text):
+    def tag_replacer(match):
+        tags_content = match.group(1)
+        tags = [t.strip() for t in tags_content.split(',')]
+        hashtag_list = [f"#{t}" for t in tags if t]
+        return "Tags: " + " ".join(hashtag_list)
+    return re.sub(r"^Tags:\s(.+)", tag_replacer, text, flags=re.MULTILINE)
+
+def process_properties_to_yaml(text):
+    if not SETTINGS['enable_yaml']: return text
+    lines = text.split('\n')
+    new_lines = []
+    yaml_props = {}
+    state = 0
+    prop_pattern = re.compile(r'^([^:\n]+):\s*(.*)$')
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if state == 0:
+            new_lines.append(line)
+            if stripped.startswith('# '): state = 1
+            continue
+        if state == 1:
+            if not stripped: continue
+            match = prop_pattern.match(stripped)
+            if match and not stripped.startswith(('http:', 'https:', 'ftp:', 'mailto:', '>')):
+                key = match.group(1).strip()
+                val = match.group(2).strip()
+                if len(key) < 50: 
+                    yaml_props[key] = val
+                    continue
+            state = 2
+            new_lines.append(line)
+            continue
+        if state == 2: new_lines.append(line)
+    if yaml_props:
+        yaml_block = ["---"]
+        for k, v in yaml_props.items():
+            if ':' in v or '#' in v: v = f'"{v}"'
+            yaml_block.append(f"{k}: {v}")
+        yaml_block.append("---\n")
+        return '\n'.join(yaml_block) + '\n'.join(new_lines)
+    return text
+
+def fix_table_formatting(text):
+    if not SETTINGS['fix_tables']: return text
+    lines = text.split('\n')
+    new_lines = []
+    buffer = ""
+    in_code_block = False
+    in_math_block = False
+    for line in lines:
+        if line.strip().startswith('```'):
+            in_code_block = not in_code_block
+            if buffer: new_lines.append(buffer); buffer = ""
+            new_lines.append(line); continue
+        if line.strip() == '$$':
+            in_math_block = not in_math_block
+            if buffer: new_lines.append(buffer); buffer = ""
+            new_lines.append(line); continue
+        if in_code_block or in_math_block: new_lines.append(line); continue
+        stripped = line.strip()
+        if buffer:
+            buffer += "<br>" + stripped
+            if stripped.endswith('|'): new_lines.append(buffer); buffer = ""
+            continue
+        if stripped.startswith('|'):
+            if stripped.endswith('|'): new_lines.append(line)
+            else: buffer = line
+        else: new_lines.append(line)
+    if buffer: new_lines.append(buffer)
+    return '\n'.join(new_lines)
+
+def clean_content(text):
+    # 原本的 convert_toggles 已移除
+    text = fix_table_formatting(text)
+    def link_replacer(match):
+        label = match.group(1)
+        url = match.group(2)
+        if url.startswith("about:blank"): return f"[[{label}]]"
+        decoded_url = urllib.parse.unquote(url)
+        if decoded_url.startswith(('http://', 'https://', 'ftp://', 'mailto:')): return match.group(0)
+        parts = decoded_url.split('/')
+        clean_parts = [get_clean_name(p) for p in parts]
+        clean_url = '/'.join(clean_parts)
+        if clean_url.lower().endswith('_all.csv'):
+            clean_url = clean_url.replace('_all.csv', '.csv')
+        if clean_url.lower().endswith('.csv'): 
+            clean_url = clean_url[:-4] + '.md'
+        encoded_clean_url = clean_url.replace(" ", "%20")
+        return f"[{label}]({encoded_clean_url})"
+    text = re.sub(r"\[(.*?)\]\((.*?)\)", link_replacer, text)
+    text = process_tags(text)
+    text = process_properties_to_yaml(text)
+    callout_map = {'💡': 'TIP', '⚠️': 'WARNING', '🚫': 'FAILURE', '✅': 'SUCCESS', 'ℹ️': 'INFO', '🔥': 'DANGER'}
+    for emoji, kind in callout_map.items():
+        text = text.replace(f"> {emoji}", f"> [!{kind}]")
+        text = text.replace(f"> **{emoji}**", f"> [!{kind}]")
+    return text
@@ -0,0 +1,172 @@
+# 轉換流程各階段的基準測試：產生模擬匯出，逐階段量測耗時、吞吐量與峰值記憶體
+# 用法: python benchmarks/run_benchmarks.py --sizes 1000,10000,100000 --output bench_results.json
+# 每個階段在獨立的子行程 (spawn) 中執行，峰值 RSS 只計入該階段本身
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_export import generate_export
+
+# 解壓縮模式依序執行的階段；stream 為另一條獨立的串流管線
+EXTRACT_STAGES = ['extract', 'rename', 'merge_csv', 'csv_to_md', 'clean_content', 'compress']
+
+def peak_rss_kb():
+    try: import resource
+    except ImportError: return None  # Windows 無 resource 模組
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def tree_stats(folder, suffixes=None):
+    files = 0
+    size = 0
+    for root, dirs, names in os.walk(folder):
+        for name in names:
+            if suffixes and not name.endswith(suffixes): continue
+            files += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+def zip_stats(zip_path):
+    # 含內部 ZIP 的成員數與解壓後大小
+    files = 0
+    size = 0
+    with zipfile.ZipFile(zip_path) as outer:
+        for info in outer.infolist():
+            if info.filename.lower().endswith('.zip'):
+                with outer.open(info) as f, zipfile.ZipFile(f) as inner:
+                    files += len(inner.infolist())
+                    size += sum(i.file_size for i in inner.infolist())
+            else:
+                files += 1
+                size += info.file_size
+    return files, size
+
+def link_pairs_path(vault):
+    # 改名階段記錄的 (原始路徑, 最終路徑)，供 clean_content 階段建立連結索引
+    return vault + "_link_pairs.json"
+
+def run_stage(stage, zip_path, vault, settings):
+    # 在子行程中執行單一階段，回傳量測結果
+    import notion_to_obsidian_bulk as converter
+    converter.SETTINGS.update(settings)
+    sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+    errors = []
+    if stage in ('extract', 'stream'): files, size = zip_stats(zip_path)
+    elif stage == 'rename': files, size = tree_stats(vault)
+    elif stage in ('merge_csv', 'csv_to_md'): files, size = tree_stats(vault, ('.csv',))
+    elif stage == 'clean_content': files, size = tree_stats(vault, ('.md',))
+    else: files, size = tree_stats(vault)
+    if stage == 'clean_content':
+        # 與 convert_extracted_folder 相同，以改名後、合併 CSV 前的對照建立連結索引 (不計入耗時)
+        with open(link_pairs_path(vault), 'r', encoding='utf-8') as f: link_index = converter.LinkIndex(vault, json.load(f))
+
+    start = time.perf_counter()
+    if stage == 'extract': converter.extract_zip(zip_path, vault)
+    elif stage == 'rename':
+        index = converter.FileIndex(vault)
+        converter.process_renaming(vault, index)
+    elif stage == 'merge_csv': converter.handle_smart_merge_csv(vault)
+    elif stage == 'csv_to_md':
+        csv_files = [os.path.join(d, n) for d, _, names in os.walk(vault) for n in names if n.endswith('.csv')]
+        for csv_path in csv_files: converter.convert_csv_to_md(csv_path, errors)
+    elif stage == 'clean_content':
+        md_files = [os.path.join(d, n) for d, _, names in os.walk(vault) for n in names if n.endswith('.md')]
+        converter.process_markdown_files(md_files, errors, converter.SETTINGS['workers'], link_index)
+    elif stage == 'compress': converter.compress_folder_to_zip(vault, None, converter.SETTINGS['workers'], converter.SETTINGS['zip_level'])
+    elif stage == 'stream': converter.stream_zip_to_vault(zip_path, vault, errors)
+    elapsed = time.perf_counter() - start
+    if stage == 'rename':
+        with open(link_pairs_path(vault), 'w', encoding='utf-8') as f: json.dump(list(index.origins()), f, ensure_ascii=False)
+
+    return {
+        'stage': stage,
+        'seconds': round(elapsed, 4),
+        'files': files,
+        'bytes': size,
+        'files_per_sec': round(files / elapsed, 1) if elapsed else None,
+        'mb_per_sec': round(size / 1024 / 1024 / elapsed, 2) if elapsed else None,
+        'peak_rss_kb': peak_rss_kb(),
+        'errors': len(errors),
+    }
+
+def measure(stage, zip_path, vault, settings):
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+        return executor.submit(run_stage, stage, zip_path, vault, settings).result()
+
+def git_commit():
+    try: return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception: return None
+
+def benchmark_size(pages, workdir, settings, modes, seed):
+    zip_path = os.path.join(workdir, f"export_{pages}.zip")
+    start = time.perf_counter()
+    count = generate_export(zip_path, pages, seed)
+    print(f"[{pages}] 已產生 {count['pages']} 頁 / {count['files']} 個檔案 ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+    result = {'pages': count['pages'], 'files': count['files'], 'export_bytes': os.path.getsize(zip_path), 'stages': []}
+    if 'extract' in modes:
+        vault = os.path.join(workdir, f"extract_{pages}")
+        for stage in EXTRACT_STAGES:
+            stats = measure(stage, zip_path, vault, settings)
+            result['stages'].append(stats)
+            print(f"[{pages}] {stage:<14} {stats['seconds']:>9.3f}s {stats['files_per_sec'] or 0:>10.1f} files/s  peak {stats['peak_rss_kb']} KB", file=sys.stderr)
+        shutil.rmtree(vault, ignore_errors=True)
+        for path in (vault + ".zip", link_pairs_path(vault)):
+            if os.path.exists(path): os.remove(path)
+    if 'stream' in modes:
+        vault = os.path.join(workdir, f"stream_{pages}")
+        stats = measure('stream', zip_path, vault, settings)
+        result['stages'].append(stats)
+        print(f"[{pages}] {'stream':<14} {stats['seconds']:>9.3f}s {stats['files_per_sec'] or 0:>10.1f} files/s  peak {stats['peak_rss_kb']} KB", file=sys.stderr)
+        shutil.rmtree(vault, ignore_errors=True)
+    os.remove(zip_path)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Notion to Obsidian 轉換流程基準測試")
+    parser.add_argument('--sizes', default='1000,10000,100000', help="以逗號分隔的頁面數")
+    parser.add_argument('--modes', default='extract,stream', help="extract (逐階段) 及/或 stream")
+    parser.add_argument('--workers', type=int, default=1, help="clean_content 階段的行程數 / compress 階段的執行緒數")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', default=None, help="暫存資料夾 (預設為系統暫存區)")
+    parser.add_argument('--output', default=None, help="JSON 結果輸出路徑 (預設輸出至 stdout)")
+    args = parser.parse_args()
+
+    settings = {'workers': args.workers, 'auto_zip': False, 'open_folder': False}
+    modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+    report = {
+        'schema': 1,
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'settings': settings,
+        'results': [],
+    }
+    workdir = tempfile.mkdtemp(prefix='n2o_bench_', dir=args.workdir)
+    try:
+        for pages in [int(s) for s in args.sizes.split(',') if s.strip()]:
+            report['results'].append(benchmark_size(pages, workdir, settings, modes, args.seed))
+    finally: shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f: f.write(text + "\n")
+    else: print(text)
+
+if __name__ == "__main__":
+    main()
@@ -9,10 +9,28 @@ CONFIG_FILE = 'config.ini'
 # 注意：隱藏的選項在此設定預設值 (True/False)，主程式會讀取這些值
 DEFAULT_SETTINGS = {
     # --- 隱藏的選項 ---
-    'move_assets': 'False',       # 移動圖片 (預設不移動)
+    'move_assets': 'False',       # 附件去重並移至附件資料夾 (預設不移動)
+    'attachments_folder': 'attachments',  # move_assets 的附件資料夾
     'enable_yaml': 'True',        # YAML 轉換 (預設開啟)
     'fix_tables': 'True',         # 表格修復 (預設開啟)
     'delete_source_csv': 'True',  # 刪除 CSV (預設開啟)
+    'workers': '1',               # 解壓縮與步驟 3 平行行程數 / 步驟 4 壓縮執行緒數 (1 為單核心)
+    'stream_convert': 'False',    # 直接從 ZIP 串流轉換 (預設關閉)
+    'incremental': 'False',       # 增量轉換，只處理變更的頁面 (預設關閉)
+    'write_report': 'True',       # 輸出 conversion_report.json 效能報告
+    'profile': 'False',           # 輸出 cProfile 資料 (預設關閉)
+    'zip_level': '6',             # 重新打包的壓縮等級 0-9 (0 為不壓縮)
+    'link_style': 'markdown',     # 內部連結格式：markdown 或 wikilink
+    'csv_mode': 'links',          # Database 索引頁：links / table / dataview
+    'stream_threshold_mb': '64',  # 超過此大小 (MB) 的筆記逐行串流處理，0 = 停用
+    'io_threads': '1',            # 重疊檔案 I/O 的執行緒數 (網路磁碟適用，1 為不重疊)
+    'io_in_flight': '32',         # 同時進行中的檔案數上限
+    'checkpoint': 'True',         # 記錄續傳日誌，中斷後可用 --resume 繼續
+    'prefilter': 'True',          # 先掃描原始位元組，略過不需轉換的筆記
+    'sqlite_index': 'False',      # 轉換時建立 SQLite 索引 (屬性、Tags、連結與全文搜尋)
+    'skip_extensions': '',        # 不解壓縮的格式，以逗號分隔 (例如 .html)
+    'batch_jobs': '0',            # 批次轉換同時進行的匯出數 (0 為依行程數自動決定)
+    'batch_io_jobs': '2',         # 批次轉換同時解壓縮 / 打包的匯出數上限
     
     # --- 顯示在介面上的選項 ---
     'auto_zip': 'True',           # [新增] 自動壓縮
@@ -1,45 +1,320 @@
 import os
 import re
 import urllib.parse
+import posixpath
+import hashlib
 import shutil
 import zipfile
 import csv
-import tkinter as tk
-from tkinter import filedialog, messagebox
 import platform
 import subprocess
 import sys
 import configparser
 import filecmp
+import functools
+import itertools
+import argparse
+import io
+import struct
+import json
+import multiprocessing
+import tempfile
+import time
+import heapq
+import collections
+import cProfile
+import contextlib
+import zlib
+import mmap
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 # ================= 全域設定 (將由 Config 控制) =================
 CONFIG_FILE = 'config.ini'
+# 由圖形介面流程開啟；無介面執行 (CLI / convert()) 時不會載入 tkinter
+GUI_MODE = False
 SETTINGS = {
     'move_assets': False,
+    'attachments_folder': 'attachments',
     'enable_yaml': True,
     'fix_tables': True,
     'delete_source_csv': True,
     'auto_zip': True,
-    'open_folder': True
+    'open_folder': True,
+    'workers': 1,
+    'stream_convert': False,
+    'incremental': False,
+    'write_report': True,
+    'profile': False,
+    'zip_level': 6,
+    'link_style': 'markdown',
+    'csv_mode': 'links',
+    'stream_threshold_mb': 64,
+    'io_threads': 1,
+    'io_in_flight': 32,
+    'checkpoint': True,
+    'prefilter': True,
+    'sqlite_index': False,
+    'skip_extensions': '',
+    'batch_jobs': 0,
+    'batch_io_jobs': 2
 }
 
-def load_settings():
+DEFAULT_SETTINGS = dict(SETTINGS)
+
+# 會清洗 Notion ID 的副檔名 (資料夾一律清洗)
+RENAME_EXTENSIONS = ('.md', '.csv', '.png', '.jpg', '.jpeg', '.pdf', '.html')
+# 串流複製附件時的區塊大小
+STREAM_CHUNK_SIZE = 1024 * 1024
+# 大型筆記逐行清洗時，每累積此行數寫出一次
+STREAM_BATCH_LINES = 4096
+# 增量轉換清單 (存放於輸出資料夾) 與會影響輸出內容的設定
+MANIFEST_FILE = '.notion_manifest.json'
+MANIFEST_SETTINGS = ('enable_yaml', 'fix_tables', 'delete_source_csv', 'link_style', 'csv_mode', 'move_assets', 'attachments_folder', 'skip_extensions')
+# 改名計畫 (與錯誤日誌放在同一資料夾)
+RENAME_PLAN_FILE = 'conversion_rename_plan.json'
+# 續傳日誌 (與錯誤日誌放在同一資料夾)；檔案記錄每累積此筆數 fsync 一次
+CHECKPOINT_FILE = 'conversion_checkpoint.jsonl'
+CHECKPOINT_BATCH = 256
+# 啟用續傳時步驟 3 先寫入此暫存檔，日誌記錄寫入磁碟後才取代原檔
+STAGED_SUFFIX = '.n2o-staged'
+# SQLite 索引 (與錯誤日誌放在同一資料夾)；每累積此篇數提交一次交易
+INDEX_DB_FILE = 'vault_index.sqlite'
+INDEX_BATCH = 1000
+# 批次轉換：預設輸出資料夾、彙總報告與錯誤日誌 (存放於批次輸出資料夾)，以及各匯出的主控台輸出 (與錯誤日誌放在同一資料夾)
+BATCH_FOLDER = 'Obsidian_Batch'
+BATCH_SUMMARY_FILE = 'batch_summary.json'
+BATCH_ERROR_LOG = 'batch_error_log.txt'
+BATCH_OUTPUT_LOG = 'conversion_output.log'
+# 重新打包時不再壓縮的格式 (本身已壓縮，deflate 只會浪費時間)
+STORE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.pdf', '.zip', '.gz', '.7z', '.mp3', '.mp4', '.mov', '.m4a', '.heic', '.docx', '.xlsx', '.pptx')
+# move_assets 時移至附件資料夾並依內容去重的格式
+ASSET_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg', '.bmp', '.heic', '.pdf', '.mp3', '.mp4', '.mov', '.m4a', '.wav', '.zip', '.docx', '.xlsx', '.pptx')
+# 超過此大小的檔案不在記憶體中平行壓縮，改由 zipfile 逐塊寫入
+PARALLEL_DEFLATE_LIMIT = 16 * 1024 * 1024
+
+def load_settings(config_file=CONFIG_FILE):
     global SETTINGS
+    SETTINGS.update(DEFAULT_SETTINGS)
     config = configparser.ConfigParser()
-    if os.path.exists(CONFIG_FILE):
+    if os.path.exists(config_file):
         try:
-            config.read(CONFIG_FILE, encoding='utf-8')
+            config.read(config_file, encoding='utf-8')
             if 'General' in config:
-                for key in SETTINGS:
-                    if key in config['General']:
-                        SETTINGS[key] = config['General'].getboolean(key)
+                for key, default in SETTINGS.items():
+                    if key not in config['General']: continue
+                    # 依預設值型別解析 (bool 需先於 int 判斷)
+                    if isinstance(default, bool): SETTINGS[key] = config['General'].getboolean(key)
+                    elif isinstance(default, int): SETTINGS[key] = config['General'].getint(key)
+                    else: SETTINGS[key] = config['General'].get(key)
         except Exception as e:
             print(f"設定檔讀取錯誤: {e}")
 
+def parse_setting_value(key, value):
+    # 將文字 (CLI 或 config.ini 格式) 依預設值型別轉換
+    default = DEFAULT_SETTINGS[key]
+    if not isinstance(value, str): return value
+    if isinstance(default, bool):
+        if value.lower() not in configparser.ConfigParser.BOOLEAN_STATES: raise ValueError(f"{key} 需為 True/False: {value}")
+        return configparser.ConfigParser.BOOLEAN_STATES[value.lower()]
+    if isinstance(default, int): return int(value)
+    return value
+
+def apply_settings(overrides):
+    for key, value in overrides.items():
+        if key not in SETTINGS: raise ValueError(f"未知的設定項目: {key}")
+        SETTINGS[key] = parse_setting_value(key, value)
+
+def ask_yes_no(title, message, default=True):
+    if not GUI_MODE:
+        print(f"[{title}] {message} (無介面模式，自動選擇「{'是' if default else '否'}」)")
+        return default
+    from tkinter import messagebox
+    return messagebox.askyesno(title, message)
+
+def show_message(title, message, error=False):
+    if not GUI_MODE: print(f"[{title}] {message}"); return
+    from tkinter import messagebox
+    if error: messagebox.showerror(title, message)
+    else: messagebox.showinfo(title, message)
+
+# ================= 效能量測 =================
+
+class Instrumentation:
+    # 記錄各階段耗時、處理量與最慢的檔案，轉換結束後輸出為 JSON 報告
+    def __init__(self, slowest=10, max_dangling=1000):
+        self.slowest = slowest
+        self.max_dangling = max_dangling
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.dangling_count = 0
+        self.dangling = []
+        self.assets = None
+        self.prefilter = {'notes': 0, 'skipped': 0, 'needs': {}}
+
+    def _record(self, name):
+        if name not in self.stages: self.stages[name] = {'seconds': 0.0, 'files': 0, 'bytes': 0, 'slowest': []}
+        return self.stages[name]
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        record = self._record(name)
+        start = time.perf_counter()
+        try: yield record
+        finally: record['seconds'] += time.perf_counter() - start
+
+    def add_file(self, name, path, nbytes=0, seconds=None):
+        record = self._record(name)
+        record['files'] += 1
+        record['bytes'] += nbytes
+        if seconds is None: return
+        # 以最小堆積保留耗時最長的 N 個檔案
+        if len(record['slowest']) < self.slowest: heapq.heappush(record['slowest'], (seconds, path))
+        elif seconds > record['slowest'][0][0]: heapq.heapreplace(record['slowest'], (seconds, path))
+
+    def add_files(self, name, count, nbytes=0):
+        record = self._record(name)
+        record['files'] += count
+        record['bytes'] += nbytes
+
+    def add_dangling(self, note, links):
+        # 失效連結只保留前 N 筆明細，總數照常累計
+        self.dangling_count += len(links)
+        for link in links[:self.max_dangling - len(self.dangling)]: self.dangling.append({'note': note, 'link': link})
+
+    def add_note_needs(self, needs):
+        # 位元組預篩的結果：各轉換需要的筆記數與完全略過的筆記數
+        self.prefilter['notes'] += 1
+        if not needs: self.prefilter['skipped'] += 1
+        for name in needs: self.prefilter['needs'][name] = self.prefilter['needs'].get(name, 0) + 1
+
+    def report(self):
+        stages = []
+        for name, record in self.stages.items():
+            seconds = record['seconds']
+            stages.append({
+                'stage': name,
+                'seconds': round(seconds, 4),
+                'files': record['files'],
+                'bytes': record['bytes'],
+                'files_per_sec': round(record['files'] / seconds, 1) if seconds else None,
+                'slowest_files': [{'path': path, 'seconds': round(sec, 4)} for sec, path in sorted(record['slowest'], reverse=True)],
+            })
+        report = {'total_seconds': round(time.perf_counter() - self.started, 4), 'stages': stages, 'dangling_links': {'count': self.dangling_count, 'links': self.dangling}, 'caches': cache_stats()}
+        if self.assets is not None: report['assets'] = self.assets
+        if self.prefilter['notes']:
+            report['prefilter'] = dict(self.prefilter, skip_ratio=round(self.prefilter['skipped'] / self.prefilter['notes'], 4))
+        return report
+
+STATS = Instrumentation()
+
+# ================= 檔案索引 =================
+
+class FileIndex:
+    # 以 os.scandir 掃描一次的目錄樹；各步驟改名、刪除或新增檔案時同步更新，不必重複走訪磁碟
+    class Node:
+        __slots__ = ('dirs', 'files')
+        def __init__(self):
+            self.dirs = {}
+            self.files = {}  # 檔名 → 掃描時的相對路徑 ('/' 分隔，供連結索引使用)；以 dict 保留 scandir 的順序
+
+    def __init__(self, root):
+        self.root = root
+        self.tree = FileIndex.Node()
+        stack = [(root, self.tree, '')]
+        while stack:
+            path, node, rel = stack.pop()
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        child = FileIndex.Node()
+                        node.dirs[entry.name] = child
+                        stack.append((entry.path, child, rel + entry.name + '/'))
+                    else: node.files[entry.name] = rel + entry.name
+
+    def node(self, dirpath):
+        rel = os.path.relpath(dirpath, self.root)
+        node = self.tree
+        if rel == os.curdir: return node
+        for part in rel.split(os.sep): node = node.dirs[part]
+        return node
+
+    def walk(self, topdown=True):
+        # 回傳 [(資料夾路徑, 節點)]；由下而上時子資料夾一定在父資料夾之前，可安全地逐層改名
+        order = []
+        stack = [(self.root, self.tree)]
+        while stack:
+            path, node = stack.pop()
+            order.append((path, node))
+            for name, child in node.dirs.items(): stack.append((os.path.join(path, name), child))
+        return order if topdown else order[::-1]
+
+    def parts(self):
+        # 回傳 (檔案路徑片段, 資料夾路徑片段)，供 RenamePlan 規劃使用
+        file_parts = []
+        dir_parts = []
+        stack = [((), self.tree)]
+        while stack:
+            parts, node = stack.pop()
+            file_parts.extend(parts + (name,) for name in node.files)
+            for name, child in node.dirs.items():
+                dir_parts.append(parts + (name,))
+                stack.append((parts + (name,), child))
+        return file_parts, dir_parts
+
+    def files(self, suffixes=None):
+        return [os.path.join(path, name) for path, node in self.walk() for name in node.files if suffixes is None or name.endswith(suffixes)]
+
+    def exists(self, path):
+        dirpath, name = os.path.split(path)
+        try: node = self.node(dirpath)
+        except KeyError: return False
+        return name in node.files or name in node.dirs
+
+    def origins(self):
+        # 產生 (掃描時的相對路徑, 目前的相對路徑)；步驟中新建立的檔案沒有原始路徑
+        for path, node in self.walk():
+            rel = os.path.relpath(path, self.root).replace(os.sep, '/')
+            prefix = '' if rel == os.curdir else rel + '/'
+            for name, origin in node.files.items():
+                if origin is not None: yield origin, prefix + name
+
+    def rename_entry(self, node, old_name, new_name):
+        if old_name in node.files: node.files[new_name] = node.files.pop(old_name)
+        else: node.dirs[new_name] = node.dirs.pop(old_name)
+
+    def add_file(self, path, origin=None):
+        dirpath, name = os.path.split(path)
+        self.node(dirpath).files[name] = origin
+
+    def remove_file(self, path):
+        dirpath, name = os.path.split(path)
+        self.node(dirpath).files.pop(name, None)
+
+    def add_dir(self, path):
+        node = self.tree
+        for part in os.path.relpath(path, self.root).split(os.sep): node = node.dirs.setdefault(part, FileIndex.Node())
+        return node
+
+    def remove_dir(self, path):
+        dirpath, name = os.path.split(path)
+        self.node(dirpath).dirs.pop(name, None)
+
 # ================= 核心功能 =================
 
+# 進度列最短重繪間隔 (秒)，避免大量檔案時每個檔案都寫入終端機
+PROGRESS_INTERVAL = 0.1
+_last_progress = 0.0
+
 def print_progress(iteration, total, prefix='', suffix='', decimals=1, length=50, fill='█', printEnd="\r"):
+    global _last_progress
     if total == 0: return
+    now = time.monotonic()
+    if 0 < iteration < total and now - _last_progress < PROGRESS_INTERVAL: return
+    _last_progress = now
     percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
     filledLength = int(length * iteration // total)
     bar = fill * filledLength + '-' * (length - filledLength)
@@ -48,244 +323,1653 @@ def print_progress(iteration, total, prefix='', suffix='', decimals=1, length=50
     if iteration == total: sys.stdout.write('\n')
 
 def get_clean_name(name):
-    # 移除 Notion ID
-    pattern = r" [0-9a-f]{32}"
-    new_name = re.sub(pattern, "", name)
-    return new_name
-
-def process_tags(text):
-    def tag_replacer(match):
-        tags_content = match.group(1)
-        tags = [t.strip() for t in tags_content.split(',')]
-        hashtag_list = [f"#{t}" for t in tags if t]
-        return "Tags: " + " ".join(hashtag_list)
-    return re.sub(r"^Tags:\s(.+)", tag_replacer, text, flags=re.MULTILINE)
-
-def process_properties_to_yaml(text):
-    if not SETTINGS['enable_yaml']: return text
-    lines = text.split('\n')
-    new_lines = []
+    # 移除 Notion ID；ID 為空白加 32 碼十六進位，短於 33 字元的名稱不可能含 ID，直接回傳
+    if len(name) < 33: return name
+    return _clean_name(name)
+
+@functools.lru_cache(maxsize=65536)
+def _clean_name(name):
+    # 同一資料夾名稱會在改名、連結與 CSV 資料列中重複出現，故快取
+    return NOTION_ID_PATTERN.sub("", name)
+
+def cache_stats():
+    # 名稱清洗與連結改寫快取的命中率 (主行程自啟動以來的累計，不含子行程)
+    stats = {}
+    for name, func in (('clean_name', _clean_name), ('link_url', rewrite_link_url)):
+        info = func.cache_info()
+        total = info.hits + info.misses
+        stats[name] = {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'hit_rate': round(info.hits / total, 4) if total else None}
+    return stats
+
+# ================= 內容轉換引擎 (單次逐行處理) =================
+
+NOTION_ID_PATTERN = re.compile(r" [0-9a-f]{32}")
+LINK_PATTERN = re.compile(r"\[(.*?)\]\((.*?)\)")
+# 未跳脫的 |：表格列中會分隔儲存格
+TABLE_PIPE_PATTERN = re.compile(r"(?<!\\)\|")
+PROPERTY_PATTERN = re.compile(r'^([^:\n]+):\s*(.*)$')
+PROPERTY_SKIP_PREFIXES = ('http:', 'https:', 'ftp:', 'mailto:', '>')
+EXTERNAL_URL_PREFIXES = ('http://', 'https://', 'ftp://', 'mailto:')
+CALLOUT_MAP = {'💡': 'TIP', '⚠️': 'WARNING', '🚫': 'FAILURE', '✅': 'SUCCESS', 'ℹ️': 'INFO', '🔥': 'DANGER'}
+CALLOUT_PATTERN = re.compile("> (?:\\*\\*(" + "|".join(map(re.escape, CALLOUT_MAP)) + ")\\*\\*|(" + "|".join(map(re.escape, CALLOUT_MAP)) + "))")
+
+@functools.lru_cache(maxsize=65536)
+def rewrite_link_url(url):
+    # 回傳修正後的內部連結網址；外部連結回傳 None (同一目標常在多篇筆記出現，故快取)
+    if url.startswith(EXTERNAL_URL_PREFIXES): return None
+    decoded_url = urllib.parse.unquote(url)
+    if decoded_url.startswith(EXTERNAL_URL_PREFIXES): return None
+    return rule_target(decoded_url).replace(" ", "%20")
+
+def rule_target(path):
+    # 只依名稱推得的目標路徑；ID 樣式不含 '/'，對整個路徑一次替換等同逐段 get_clean_name
+    clean_path = NOTION_ID_PATTERN.sub("", path) if len(path) > 32 else path
+    if clean_path.lower().endswith('_all.csv'):
+        clean_path = clean_path.replace('_all.csv', '.csv')
+    if clean_path.lower().endswith('.csv'):
+        clean_path = clean_path[:-4] + '.md'
+    return clean_path
+
+def link_replacer(match):
+    label, url = match.group(1, 2)
+    if url.startswith("about:blank"): return f"[[{label}]]"
+    clean_url = rewrite_link_url(url)
+    if clean_url is None: return match.group(0)
+    return f"[{label}]({clean_url})"
+
+class LinkIndex:
+    # 全 vault 的連結索引：原始 (含 Notion ID) 相對路徑 → 最終 vault 路徑，建立一次後每個連結只需查表
+    # 目標不存在的連結回報為失效連結，並沿用依名稱推得的路徑
+    def __init__(self, root, pairs):
+        self.root = root
+        self.targets = {}
+        self.source_dirs = {}  # 最終筆記路徑 → 原始資料夾；相對連結以筆記在匯出中的位置解析
+        for origin, final in pairs:
+            if final.endswith('.csv'):
+                # 與 CSV 智慧合併及 CSV 轉 MD 相同：Database 連結指向索引筆記
+                if final.lower().endswith('_all.csv'): final = final[:-8] + ".csv"
+                final = final[:-4] + ".md"
+            self.targets[origin] = final
+            self.source_dirs.setdefault(final, posixpath.dirname(origin))
+        self.cache = {}
+
+    def digest(self):
+        # 只有與依名稱推得的路徑不同 (同名衝突) 的項目會影響連結輸出，增量轉換以此判斷是否需重轉筆記
+        irregular = sorted((origin, final) for origin, final in self.targets.items() if final != rule_target(origin))
+        return hashlib.sha1(json.dumps(irregular, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def resolve(self, url, source_dir, final_dir):
+        # 回傳 (新網址, 最終 vault 路徑, 目標是否存在, 解碼後的 #錨點)；外部連結回傳新網址 None
+        rule_url = rewrite_link_url(url)
+        if rule_url is None: return None, None, True, ''
+        path, sep, fragment = urllib.parse.unquote(url).partition('#')
+        if not path: return rule_url, None, True, fragment  # 頁內錨點
+        final = self.targets.get(posixpath.normpath(posixpath.join(source_dir, path)))
+        rule_path = posixpath.normpath(posixpath.join(final_dir, rule_target(path)))
+        if final is None: return rule_url, rule_path, False, fragment
+        if final == rule_path: return rule_url, final, True, fragment
+        return (posixpath.relpath(final, final_dir or '.') + sep + fragment).replace(" ", "%20"), final, True, fragment
+
+    def target(self, note_path, url):
+        # 連結的最終 vault 路徑；外部連結與頁內錨點回傳 None
+        final_dir = posixpath.dirname(note_path)
+        source_dir = self.source_dirs.get(note_path, final_dir)
+        key = (source_dir, url)
+        link = self.cache.get(key)
+        if link is None: link = self.cache[key] = self.resolve(url, source_dir, final_dir)
+        return link[1]
+
+    def replacer(self, note_path):
+        # 回傳 (給 LINK_PATTERN.sub 使用的替換函式, 此筆記的失效連結清單)；note_path 為最終 vault 路徑
+        final_dir = posixpath.dirname(note_path)
+        source_dir = self.source_dirs.get(note_path, final_dir)
+        wikilinks = SETTINGS['link_style'] == 'wikilink'
+        dangling = []
+        def replace(match):
+            label, url = match.group(1, 2)
+            if url.startswith("about:blank"): return f"[[{label}]]"
+            key = (source_dir, url)
+            link = self.cache.get(key)
+            if link is None: link = self.cache[key] = self.resolve(url, source_dir, final_dir)
+            new_url, vault_path, found, fragment = link
+            if new_url is None: return match.group(0)
+            if not found: dangling.append(urllib.parse.unquote(url))
+            if wikilinks and vault_path:
+                # 保留標題錨點：[[路徑#標題|顯示文字]]；表格列中的 | 會分隔儲存格，改寫為 \|
+                name = vault_path[:-3] if vault_path.endswith('.md') else vault_path
+                target = f"{name}#{fragment}" if fragment else name
+                link = f"[[{target}]]" if label == posixpath.basename(name) and not fragment else f"[[{target}|{label}]]"
+                return TABLE_PIPE_PATTERN.sub(r"\\|", link) if match.string.lstrip().startswith('|') else link
+            return f"[{label}]({new_url})"
+        return replace, dangling
+
+# 目前轉換使用的連結索引；子行程由 _init_worker 設定
+LINK_INDEX = None
+# dataview 模式中已由 Database CSV 寫入屬性的資料列頁面 (相對路徑)，只有這些筆記的 frontmatter 與 Properties 合併
+ROW_PAGES = frozenset()
+
+def callout_replacer(match):
+    return f"> [!{CALLOUT_MAP[match.group(1) or match.group(2)]}]"
+
+def yaml_value(value):
+    if ':' in value or '#' in value: return f'"{value}"'
+    return value
+
+def read_frontmatter(lines):
+    # 開頭為 --- frontmatter 時回傳 ([鍵, 值] 清單, 其後各行的迭代器)，否則回傳 (None, 原本各行的迭代器)
+    # 無法解析為 "鍵: 值" 的行以鍵 None 原樣保留
+    lines = iter(lines)
+    first = next(lines, None)
+    if first != '---': return None, itertools.chain(() if first is None else (first,), lines)
+    block = []
+    for line in lines:
+        if line == '---':
+            entries = []
+            for raw in block:
+                match = PROPERTY_PATTERN.match(raw) if raw[:1].strip() else None
+                if match:
+                    value = match.group(2).strip()
+                    if len(value) > 1 and value[0] == value[-1] == '"': value = value[1:-1]
+                    entries.append([match.group(1).strip(), value])
+                else: entries.append([None, raw])
+            # 與 text.split('\n') 相同，結尾的 --- 之後至少還有一個 (空) 行
+            rest = next(lines, None)
+            return entries, itertools.chain(('' if rest is None else rest,), lines)
+        block.append(line)
+    return None, itertools.chain((first,), block)
+
+def format_tags(tags_content):
+    tags = [t.strip() for t in tags_content.split(',')]
+    hashtag_list = [f"#{t}" for t in tags if t]
+    return "Tags: " + " ".join(hashtag_list)
+
+def clean_content(text, replace_link=link_replacer, page=None, merge_front=False):
+    # 單次逐行完成：表格斷行修復 → 連結修正 → Tags → Properties 轉 YAML → Callout
+    # 各步驟的規則與順序和舊版多次掃描的實作相同，輸出完全一致；replace_link 可換成 LinkIndex 的替換函式
+    # merge_front 只用於已寫入資料列屬性的頁面：開頭的 frontmatter 與 Properties 合併為單一區塊
+    return '\n'.join(next(clean_lines(text.split('\n'), replace_link, page=page, merge_front=merge_front)))
+
+def new_page():
+    # clean_lines 解析時順便收集的筆記資料，供 SQLite 索引使用；body 由呼叫端填入轉換後的內容
+    return {'properties': [], 'tags': [], 'links': [], 'body': None}
+
+def clean_lines(lines, replace_link=link_replacer, pending=None, batch=0, page=None, merge_front=False):
+    # clean_content 的逐行引擎：lines 為不含換行符號的行，分批產生輸出行；batch 為 0 時處理完才一次產生
+    # YAML 區塊位於最前面，決定前 (標題與屬性區) 的輸出暫存於 pending，大型筆記可傳入 LineSpool 以免佔用記憶體
+    # page 為 new_page() 時一併記錄 YAML 屬性、Tags 與連結 (標籤, 原始網址)，輸出不受影響
+    fix_tables = SETTINGS['fix_tables']
     yaml_props = {}
-    state = 0
-    prop_pattern = re.compile(r'^([^:\n]+):\s*(.*)$')
-    for i, line in enumerate(lines):
-        stripped = line.strip()
-        if state == 0:
-            new_lines.append(line)
-            if stripped.startswith('# '): state = 1
-            continue
+    front = None  # merge_front 時開頭的 frontmatter (Database 資料列的屬性)，與 Properties 合併為單一區塊；其餘筆記的 --- 區塊與舊版相同視為一般內容
+    held_blanks = []  # 標題後被略過的空行，若最後沒有屬性需還原
+    state = 0 if SETTINGS['enable_yaml'] else 2
+    tags_pending = False  # 單獨一行 "Tags:" 時，與舊版 ^Tags:\s(.+) 相同會併入下一行
+    if state == 0 and merge_front: front, lines = read_frontmatter(lines)
+    out = pending if state != 2 and pending is not None else []
+    tag_line = format_tags
+    if page is not None:
+        rewrite_link = replace_link
+        def replace_link(match):
+            page['links'].append(match.group(1, 2))
+            return rewrite_link(match)
+        def tag_line(tags_content):
+            page['tags'].extend(t for t in (t.strip() for t in tags_content.split(',')) if t)
+            return format_tags(tags_content)
+
+    def resolve_header():
+        # 屬性區結束：產生 YAML 區塊，接上暫存的輸出，之後的行直接輸出
+        nonlocal out
+        entries = list(yaml_props.items())
+        if front:
+            # 筆記中的 Properties 覆寫同名的既有值，其餘附加於後
+            keyed = {entry[0]: entry for entry in front if entry[0] is not None}
+            for k, v in entries:
+                if k in keyed: keyed[k][1] = v
+                else: front.append([k, v])
+            entries = front
+        if page is not None: page['properties'] = [(k, v) for k, v in entries if k is not None]
+        block = []
+        if entries or front is not None:
+            block.append("---")
+            for k, v in entries:
+                if k is None: block.append(v); continue
+                line = f"{k}: {yaml_value(v)}"
+                if '> ' in line: line = CALLOUT_PATTERN.sub(callout_replacer, line)
+                block.append(line)
+            block.append("---")
+        block.extend(out)
+        out = block
+
+    def add_line(line):
+        # Properties 轉 YAML：0 = 尋找標題、1 = 讀取屬性、2 = 本文
+        nonlocal state
         if state == 1:
-            if not stripped: continue
-            match = prop_pattern.match(stripped)
-            if match and not stripped.startswith(('http:', 'https:', 'ftp:', 'mailto:', '>')):
+            stripped = line.strip()
+            if not stripped: held_blanks.append(line); return
+            match = PROPERTY_PATTERN.match(stripped)
+            if match and not stripped.startswith(PROPERTY_SKIP_PREFIXES):
                 key = match.group(1).strip()
-                val = match.group(2).strip()
-                if len(key) < 50: 
-                    yaml_props[key] = val
-                    continue
+                if len(key) < 50:
+                    yaml_props[key] = match.group(2).strip()
+                    return
             state = 2
-            new_lines.append(line)
-            continue
-        if state == 2: new_lines.append(line)
-    if yaml_props:
-        yaml_block = ["---"]
-        for k, v in yaml_props.items():
-            if ':' in v or '#' in v: v = f'"{v}"'
-            yaml_block.append(f"{k}: {v}")
-        yaml_block.append("---\n")
-        return '\n'.join(yaml_block) + '\n'.join(new_lines)
-    return text
-
-def fix_table_formatting(text):
-    if not SETTINGS['fix_tables']: return text
-    lines = text.split('\n')
-    new_lines = []
+            if not yaml_props: out.extend(held_blanks)
+            resolve_header()
+        elif state == 0 and line.strip().startswith('# '): state = 1
+        if '> ' in line: line = CALLOUT_PATTERN.sub(callout_replacer, line)
+        out.append(line)
+
+    def emit(line):
+        nonlocal tags_pending
+        if '](' in line: line = LINK_PATTERN.sub(replace_link, line)
+        if tags_pending:
+            tags_pending = False
+            if line: add_line(tag_line(line)); return
+            add_line("Tags:")
+        if line.startswith('Tags:'):
+            rest = line[5:]
+            if not rest: tags_pending = True; return
+            if len(rest) > 1 and rest[0].isspace(): line = tag_line(rest[1:])
+        add_line(line)
+
     buffer = ""
     in_code_block = False
     in_math_block = False
     for line in lines:
-        if line.strip().startswith('```'):
-            in_code_block = not in_code_block
-            if buffer: new_lines.append(buffer); buffer = ""
-            new_lines.append(line); continue
-        if line.strip() == '$$':
-            in_math_block = not in_math_block
-            if buffer: new_lines.append(buffer); buffer = ""
-            new_lines.append(line); continue
-        if in_code_block or in_math_block: new_lines.append(line); continue
-        stripped = line.strip()
-        if buffer:
-            buffer += "<br>" + stripped
-            if stripped.endswith('|'): new_lines.append(buffer); buffer = ""
-            continue
-        if stripped.startswith('|'):
-            if stripped.endswith('|'): new_lines.append(line)
-            else: buffer = line
-        else: new_lines.append(line)
-    if buffer: new_lines.append(buffer)
-    return '\n'.join(new_lines)
-
-def clean_content(text):
-    # 原本的 convert_toggles 已移除
-    text = fix_table_formatting(text)
-    def link_replacer(match):
-        label = match.group(1)
-        url = match.group(2)
-        if url.startswith("about:blank"): return f"[[{label}]]"
-        decoded_url = urllib.parse.unquote(url)
-        if decoded_url.startswith(('http://', 'https://', 'ftp://', 'mailto:')): return match.group(0)
-        parts = decoded_url.split('/')
-        clean_parts = [get_clean_name(p) for p in parts]
-        clean_url = '/'.join(clean_parts)
-        if clean_url.lower().endswith('_all.csv'):
-            clean_url = clean_url.replace('_all.csv', '.csv')
-        if clean_url.lower().endswith('.csv'): 
-            clean_url = clean_url[:-4] + '.md'
-        encoded_clean_url = clean_url.replace(" ", "%20")
-        return f"[{label}]({encoded_clean_url})"
-    text = re.sub(r"\[(.*?)\]\((.*?)\)", link_replacer, text)
-    text = process_tags(text)
-    text = process_properties_to_yaml(text)
-    callout_map = {'💡': 'TIP', '⚠️': 'WARNING', '🚫': 'FAILURE', '✅': 'SUCCESS', 'ℹ️': 'INFO', '🔥': 'DANGER'}
-    for emoji, kind in callout_map.items():
-        text = text.replace(f"> {emoji}", f"> [!{kind}]")
-        text = text.replace(f"> **{emoji}**", f"> [!{kind}]")
-    return text
-
-def handle_smart_merge_csv(target_dir):
+        if batch and state == 2 and len(out) >= batch:
+            yield out
+            out = []
+        if fix_tables and (buffer or '|' in line or '```' in line or '$$' in line):
+            # 表格斷行修復 (排除 Code / Math 區塊)；區塊標記與完整的表格列照常往下處理
+            stripped = line.strip()
+            if stripped.startswith('```'):
+                in_code_block = not in_code_block
+                if buffer: emit(buffer); buffer = ""
+            elif stripped == '$$':
+                in_math_block = not in_math_block
+                if buffer: emit(buffer); buffer = ""
+            elif in_code_block or in_math_block: pass
+            elif buffer:
+                buffer += "<br>" + stripped
+                if stripped.endswith('|'): emit(buffer); buffer = ""
+                continue
+            elif stripped.startswith('|') and not stripped.endswith('|'): buffer = line; continue
+        if state == 2 and not tags_pending and not line.startswith('Tags:'):
+            # 本文行只需連結與 Callout 轉換 (與 emit → add_line 相同)，大部分不需任何轉換直接輸出
+            # 連結替換結果以 [ 開頭，不會使本行變成 Tags: 行
+            if '](' in line: line = LINK_PATTERN.sub(replace_link, line)
+            if '> ' in line: line = CALLOUT_PATTERN.sub(callout_replacer, line)
+            out.append(line)
+        else: emit(line)
+    if buffer: emit(buffer)
+    if tags_pending: add_line("Tags:")
+    if state == 1 and not yaml_props: out.extend(held_blanks)
+    if state != 2: resolve_header()
+    yield out
+
+class LineSpool:
+    # 行緩衝區：超過 max_size 後改存於暫存檔，用於暫存大型筆記 YAML 區塊決定前的輸出
+    def __init__(self, max_size=STREAM_CHUNK_SIZE * 8):
+        self.file = tempfile.SpooledTemporaryFile(max_size, mode='w+', encoding='utf-8', newline='\n')
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.file.close()
+
+    def append(self, line): self.file.write(line + '\n')
+
+    def extend(self, lines):
+        for line in lines: self.append(line)
+
+    def __iter__(self):
+        self.file.seek(0)
+        for line in self.file: yield line[:-1]
+
+def iter_text_lines(f):
+    # 與 f.read().split('\n') 相同，但一次只讀一行；以文字模式開啟時換行符號已統一為 \n
+    line = ''
+    for line in f: yield line[:-1] if line.endswith('\n') else line
+    if not line or line.endswith('\n'): yield ''
+
+def clean_stream(lines, out_path, replace_link=link_replacer, page=None, merge_front=False):
+    # 大型筆記的串流模式：逐批寫入 out_path + '.tmp'，回傳 (內容是否有修改, 暫存檔路徑)
+    # 暫存檔以一般的 open 建立 (依 umask，與其他筆記相同)；mkstemp 的 0600 會在取代後讓大型筆記只有擁有者可讀
+    # 峰值記憶體取決於最長的一行 (或表格列)，是否修改以輸入與輸出的雜湊比較
+    source_hash = hashlib.sha1()
+    result_hash = hashlib.sha1()
+    def hashed(lines):
+        for line in lines:
+            source_hash.update(line.encode('utf-8') + b'\n')
+            yield line
+    tmp_path = out_path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as dst, LineSpool() as pending:
+            first = True
+            for batch in clean_lines(hashed(lines), replace_link, pending, STREAM_BATCH_LINES, page, merge_front):
+                if not batch: continue
+                for line in batch: result_hash.update(line.encode('utf-8') + b'\n')
+                if not first: dst.write('\n')
+                dst.write('\n'.join(batch))
+                first = False
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return source_hash.digest() != result_hash.digest(), tmp_path
+
+CALLOUT_BYTES = re.compile(CALLOUT_PATTERN.pattern.encode('utf-8'))
+PREFILTER_MMAP_BYTES = 1 << 16  # 小於此大小的筆記直接讀入，mmap 的建立成本高於讀檔
+
+def note_triggers(data):
+    # 直接掃描原始位元組 (bytes 或 mmap)，回傳筆記需要的轉換；判斷只會多不會少，清單為空時 clean_content 的輸出必定與原文相同
+    needs = []
+    if SETTINGS['enable_yaml']:
+        if data[:3] == b'---': needs.append('frontmatter')
+        if title_has_properties(data): needs.append('properties')
+    if SETTINGS['fix_tables'] and line_start_find(data, b'|') >= 0: needs.append('tables')
+    if data.find(b'](') >= 0: needs.append('links')
+    if data.find(b'Tags:') >= 0: needs.append('tags')
+    if data.find(b'> ') >= 0 and CALLOUT_BYTES.search(data): needs.append('callouts')
+    return needs
+
+def line_end(data, pos, has_cr):
+    # pos 所在行的結尾 (不含換行字元)；行的切分與 clean_content 相同 (\r\n、\r 視為換行)
+    end = data.find(b'\n', pos)
+    if end < 0: end = len(data)
+    if has_cr:
+        cr = data.find(b'\r', pos, end)
+        if cr >= 0: end = cr
+    return end
+
+def line_start_find(data, token, pos=0):
+    # 尋找 strip() 後以 token 開頭的行，回傳該行起點
+    # 只檢查每行第一個 token 之前的位元組；不符時直接跳到下一行，長行 (例如貼上的日誌) 維持線性時間
+    has_cr = data.find(b'\r') >= 0
+    pos = data.find(token, pos)
+    while pos >= 0:
+        start = data.rfind(b'\n', 0, pos) + 1
+        if has_cr: start = max(start, data.rfind(b'\r', start, pos) + 1)
+        if not data[start:pos].decode('utf-8', 'replace').strip(): return start
+        end = line_end(data, pos, has_cr)
+        if end >= len(data): break
+        pos = data.find(token, end + 1)
+    return -1
+
+def print_prefilter_summary(summary):
+    if not summary['notes']: return
+    needs = ', '.join(f"{name} {count}" for name, count in sorted(summary['needs'].items()))
+    print(f"位元組預篩：{summary['notes']} 篇筆記中有 {summary['skipped']} 篇 ({summary['skipped'] / summary['notes']:.1%}) 不需轉換而略過" + (f"；需要的轉換: {needs}" if needs else "") + "。")
+
+def title_has_properties(data):
+    # 與 clean_lines 相同：只有第一個標題之後的第一個非空白行是屬性時，才會產生 YAML
+    has_cr = data.find(b'\r') >= 0
+    start = line_start_find(data, b'# ')
+    while start >= 0:
+        end = line_end(data, start, has_cr)
+        if data[start:end].decode('utf-8', 'replace').strip().startswith('# '): break
+        start = line_start_find(data, b'# ', end)
+    else: return False
+    while end < len(data):
+        start = end + 1
+        end = line_end(data, start, has_cr)
+        stripped = data[start:end].decode('utf-8', 'replace').strip()
+        if not stripped: continue
+        match = PROPERTY_PATTERN.match(stripped)
+        return bool(match) and not stripped.startswith(PROPERTY_SKIP_PREFIXES) and len(match.group(1).strip()) < 50
+    return False
+
+def stream_threshold():
+    # 超過此大小 (位元組) 的筆記改用串流模式；0 表示停用
+    return SETTINGS['stream_threshold_mb'] * 1024 * 1024
+
+def note_link_replacer(note_path):
+    # 回傳 (連結替換函式, 失效連結清單)；沒有連結索引時沿用依名稱推得的規則
+    if LINK_INDEX is None: return link_replacer, []
+    return LINK_INDEX.replacer(note_path)
+
+def repair_markdown_file(file_path, staged=False, merge_front=None):
+    # 回傳 (是否有修改, 錯誤訊息, 位元組數, clean_content 耗時, 失效連結, 需要的轉換, 索引資料)；可在子行程中執行
+    # staged 時修改後的內容寫入 file_path + STAGED_SUFFIX，由主行程於日誌記錄後取代原檔
+    # merge_front 為 None 時依 ROW_PAGES 判斷是否合併 frontmatter (串流模式由呼叫端指定)
+    # prefilter 時先以 mmap 掃描原始位元組，沒有任何觸發的筆記不解碼也不轉換；需要的轉換為 None 表示未預篩
+    # sqlite_index 時索引資料為 new_page()，由同一次解析取得，大型筆記 (串流路徑) 不含 body；失敗時為 None
+    out_path = file_path + STAGED_SUFFIX if staged else file_path
+    nbytes = 0
+    seconds = None
+    dangling = []
+    needs = None
+    page = new_page() if SETTINGS['sqlite_index'] else None
+    try:
+        nbytes = os.path.getsize(file_path)
+        large = stream_threshold() and nbytes >= stream_threshold()
+        content = None
+        if SETTINGS['prefilter']:
+            start = time.perf_counter()
+            with open(file_path, 'rb') as f, (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if nbytes >= PREFILTER_MMAP_BYTES else contextlib.nullcontext(f.read())) as data:
+                needs = note_triggers(data)
+                # 需要轉換時直接由同一份位元組解碼，與文字模式讀檔相同統一換行符號；大型筆記仍交由串流路徑
+                if needs and not large: content = data[:].decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+                # 略過的筆記只為全文索引解碼，不轉換
+                elif not needs and page is not None and not large: page['body'] = data[:].decode('utf-8', 'replace').replace('\r\n', '\n').replace('\r', '\n')
+            if not needs: return False, None, nbytes, time.perf_counter() - start, dangling, needs, page
+        note_path = os.path.relpath(file_path, LINK_INDEX.root).replace(os.sep, '/') if LINK_INDEX else None
+        replace_link, dangling = note_link_replacer(note_path)
+        if merge_front is None: merge_front = note_path in ROW_PAGES
+        if large:
+            # 大型筆記逐行處理，寫入暫存檔後以 os.replace 取代原檔
+            start = time.perf_counter()
+            with open(file_path, 'r', encoding='utf-8') as f: changed, tmp_path = clean_stream(iter_text_lines(f), file_path, replace_link, page, merge_front)
+            if changed: os.replace(tmp_path, out_path)
+            else: os.remove(tmp_path)
+            return changed, None, nbytes, time.perf_counter() - start, dangling, needs, page
+        if content is None:
+            with open(file_path, 'r', encoding='utf-8') as f: content = f.read()
+        start = time.perf_counter()
+        new_content = clean_content(content, replace_link, page, merge_front)
+        seconds = time.perf_counter() - start
+        if page is not None: page['body'] = new_content
+        if new_content != content:
+            with open(out_path, 'w', encoding='utf-8') as f: f.write(new_content)
+            return True, None, nbytes, seconds, dangling, needs, page
+        return False, None, nbytes, seconds, dangling, needs, page
+    except Exception as e:
+        if staged and os.path.exists(out_path): os.remove(out_path)
+        return False, f"[筆記失敗] {os.path.basename(file_path)}: {e}", nbytes, seconds, dangling, needs, None
+
+# 批次轉換時由主行程建立的跨行程號誌，限制同時進行解壓縮 / 串流 / 打包的匯出數；單獨轉換時為 None
+IO_GATE = None
+
+def io_gate():
+    return IO_GATE if IO_GATE is not None else contextlib.nullcontext()
+
+def _init_worker(settings, link_index=None, row_pages=frozenset()):
+    # 子行程 (Windows 為 spawn) 不會繼承主行程載入的設定、連結索引與資料列頁面
+    global LINK_INDEX, ROW_PAGES
+    SETTINGS.update(settings)
+    LINK_INDEX = link_index
+    ROW_PAGES = row_pages
+
+def ordered_io_map(func, items, threads, in_flight):
+    # 以執行緒池重疊檔案 I/O (網路磁碟上每次開檔、讀寫、改名都要等待來回)
+    # 最多 in_flight 個項目同時進行，結果依原順序產生，與逐一執行的結果相同
+    in_flight = max(1, in_flight)
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = {i: executor.submit(func, items[i]) for i in range(min(in_flight, len(items)))}
+        for i in range(len(items)):
+            if i + in_flight < len(items): futures[i + in_flight] = executor.submit(func, items[i + in_flight])
+            yield futures.pop(i).result()
+
+def io_map(func, items):
+    # io_threads > 1 時重疊 I/O，否則逐一執行
+    if SETTINGS['io_threads'] > 1 and len(items) > 1: return ordered_io_map(func, items, SETTINGS['io_threads'], SETTINGS['io_in_flight'])
+    return map(func, items)
+
+def process_markdown_files(md_files, error_list, workers=1, link_index=None, checkpoint=None, row_pages=()):
+    # 依檔案順序彙整結果，錯誤日誌與單核心結果一致；續傳時已記錄完成的筆記直接取回結果
+    # sqlite_index 時由主行程將各筆記的索引資料寫入 SQLite；續傳時沿用上次的索引，已完成的筆記不再寫入
+    # row_pages 為 convert_csv_files 寫入資料列屬性的頁面 (相對路徑)
+    global LINK_INDEX, ROW_PAGES
+    if checkpoint is None: checkpoint = Checkpoint()
+    staged = checkpoint.enabled
+    note_path = lambda path: os.path.relpath(path, link_index.root).replace(os.sep, "/")
+    done = checkpoint.files('clean_content')
+    todo = [path for path in md_files if note_path(path) not in done] if done else md_files
+    repair = functools.partial(repair_markdown_file, staged=True) if staged else repair_markdown_file
+    total_md = len(md_files)
+    processed_count = 0
+    batch = []
+    print_progress(0, total_md, prefix='進度:', suffix='完成', length=40)
+    LINK_INDEX = link_index
+    ROW_PAGES = frozenset(row_pages)
+    try:
+        with contextlib.ExitStack() as stack:
+            vault_index = stack.enter_context(VaultIndex(index_db_path(link_index.root), link_index, keep=bool(done))) if SETTINGS['sqlite_index'] and link_index else None
+            if workers > 1 and len(todo) > 1:
+                # 依檔案分塊送入行程池；map 保持原順序
+                chunksize = max(1, min(64, len(todo) // (workers * 4)))
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(dict(SETTINGS), link_index, ROW_PAGES)))
+                results = executor.map(repair, todo, chunksize=chunksize)
+            else: results = io_map(repair, todo)
+            for i, file_path in enumerate(md_files):
+                record = done.get(note_path(file_path)) if done else None
+                if record is None:
+                    changed, error, nbytes, seconds, dangling, needs, page = next(results)
+                    STATS.add_file('clean_content', file_path, nbytes, seconds)
+                    if vault_index is not None and page is not None: vault_index.add(note_path(file_path), page)
+                    if staged:
+                        batch.append((file_path, changed, {'file': note_path(file_path), 'changed': changed, 'error': error, 'dangling': dangling, 'needs': needs}))
+                        if len(batch) >= CHECKPOINT_BATCH: commit_staged(batch, checkpoint, vault_index, error_list)
+                else: changed, error, dangling, needs = record['changed'], record['error'], record['dangling'], record.get('needs')
+                if needs is not None: STATS.add_note_needs(needs)
+                if changed: processed_count += 1
+                if error: error_list.append(error)
+                if dangling: STATS.add_dangling(note_path(file_path), dangling)
+                print_progress(i + 1, total_md, prefix='進度:', suffix='完成', length=40)
+            commit_staged(batch, checkpoint, vault_index, error_list)
+    finally:
+        LINK_INDEX = None
+        ROW_PAGES = frozenset()
+    print_prefilter_summary(STATS.prefilter)
+    return processed_count
+
+def replace_staged(staged_path, file_path, checkpoint, error_list):
+    # 原檔被其他程式開啟 (Obsidian、同步軟體、防毒) 時 Windows 無法取代：記錄錯誤並保留暫存檔與日誌，--resume 時重試
+    try: os.replace(staged_path, file_path)
+    except OSError as e:
+        error_list.append(f"[筆記失敗] {os.path.basename(file_path)}: 無法取代原檔，已保留暫存檔，可用 --resume 重試 ({e})")
+        if checkpoint.path: KEEP_CHECKPOINTS.add(checkpoint.path)
+
+def commit_staged(batch, checkpoint, vault_index=None, error_list=None):
+    # 日誌記錄寫入磁碟後才以暫存檔取代原檔：中斷時已記錄者於續傳時完成取代，未記錄者重新處理，每篇筆記只會轉換一次
+    # 記錄於 SQLite 索引提交後才寫入，日誌中已完成的筆記必定已在索引中；重新處理的筆記覆寫索引中的舊資料
+    if error_list is None: error_list = []
+    if vault_index is not None: vault_index.commit()
+    for file_path, changed, record in batch: checkpoint.log('clean_content', sync=False, **record)
+    checkpoint.sync()
+    for file_path, changed, record in batch:
+        if changed: replace_staged(file_path + STAGED_SUFFIX, file_path, checkpoint, error_list)
+    batch.clear()
+
+def recover_staged(target_dir, index, checkpoint, error_list=None):
+    if error_list is None: error_list = []
+    done = checkpoint.files('clean_content')
+    for path in index.files(STAGED_SUFFIX):
+        md_path = path[:-len(STAGED_SUFFIX)]
+        record = done.get(os.path.relpath(md_path, target_dir).replace(os.sep, '/'))
+        if record and record['changed']: replace_staged(path, md_path, checkpoint, error_list)
+        else: os.remove(path)
+        index.remove_file(path)
+
+def handle_smart_merge_csv(target_dir, index=None):
     print("正在執行 CSV 智慧合併與清理...")
-    csv_files = []
-    for root, dirs, files in os.walk(target_dir):
-        for f in files:
-            if f.endswith('.csv'):
-                csv_files.append(os.path.join(root, f))
+    if index is None: index = FileIndex(target_dir)
+    csv_files = index.files('.csv')
     all_variants = [f for f in csv_files if f.lower().endswith('_all.csv')]
+    STATS.add_files('merge_csv', len(all_variants))
     for all_file in all_variants:
         original_file = all_file[:-8] + ".csv"
-        if os.path.exists(original_file):
-            size_all = os.path.getsize(all_file)
-            size_orig = os.path.getsize(original_file)
-            if size_all > size_orig:
-                try: shutil.move(all_file, original_file)
-                except Exception as e: print(f"  [錯誤] 合併失敗: {e}")
-            else:
-                try: os.remove(all_file)
-                except: pass
+        if index.exists(original_file):
+            # 以第一欄為鍵逐列合併，不再只依檔案大小擇一
+            try:
+                write_csv_rows(merge_csv_rows(text_opener(all_file), text_opener(original_file)), original_file)
+                os.remove(all_file); index.remove_file(all_file)
+            except Exception as e: print(f"  [錯誤] 合併失敗: {e}")
         else:
-            try: os.rename(all_file, original_file)
+            try: os.rename(all_file, original_file); index.remove_file(all_file); index.add_file(original_file)
             except: pass
 
-def convert_csv_to_md(file_path, error_list):
+DATAVIEW_FIELD_PATTERN = re.compile(r'[^\W\d]\w*')
+
+# CSV 串流引擎：逐列讀取、逐列輸出，記憶體用量與資料列數無關
+
+def text_opener(path):
+    return lambda: open(path, 'r', encoding='utf-8', errors='ignore', newline='')
+
+def csv_rows(open_text):
+    # 依序產生欄位名稱與各資料列；open_text 每次呼叫回傳新的文字檔物件 (檔案或 ZIP 成員)
+    with open_text() as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None: return
+        if header: header[0] = header[0].lstrip('\ufeff')  # Notion 匯出的 CSV 帶有 BOM
+        yield header
+        yield from reader
+
+def merge_csv_rows(open_all, open_view):
+    # 逐列合併 _all.csv (完整資料) 與目前檢視的 CSV：以第一欄 (Name) 為鍵、欄位取聯集
+    # _all.csv 的列依原順序輸出，只存在於目前檢視的列附加於後；記憶體只保留鍵與目前檢視獨有欄位的值
+    view_header = next(csv_rows(open_view), None)
+    all_rows = csv_rows(open_all)
+    all_header = next(all_rows, None)
+    if all_header is None or view_header is None:
+        yield from csv_rows(open_view if all_header is None else open_all)
+        return
+    extra = [i for i, name in enumerate(view_header) if name not in all_header]
+    extra_values = {}
+    if extra:
+        for row in itertools.islice(csv_rows(open_view), 1, None):
+            if row: extra_values.setdefault(row[0], [row[i] if i < len(row) else '' for i in extra])
+    header = all_header + [view_header[i] for i in extra]
+    width = len(all_header)
+    yield header
+    keys = set()
+    for row in all_rows:
+        if not row: continue
+        keys.add(row[0])
+        if extra: row = (row + [''] * width)[:width] + extra_values.get(row[0], [''] * len(extra))
+        yield row
+    positions = [header.index(name) for name in view_header]
+    for row in itertools.islice(csv_rows(open_view), 1, None):
+        if not row or row[0] in keys: continue
+        merged = [''] * len(header)
+        for i, value in enumerate(row[:len(positions)]): merged[positions[i]] = value
+        yield merged
+
+def write_csv_rows(rows, path):
+    # 先寫入暫存檔再取代，讀取來源與輸出可為同一檔案
+    with open(path + '.tmp', 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        for row in rows: writer.writerow(row)
+    os.replace(path + '.tmp', path)
+
+def table_cell(value):
+    return value.replace('|', '\\|').replace('\r\n', '<br>').replace('\n', '<br>')
+
+def row_frontmatter(header, row):
+    # 資料列的各欄位 (第一欄為頁面標題) 轉為 "鍵: 值" 行
+    props = []
+    for key, value in zip(header[1:], row[1:]):
+        key = key.strip()
+        value = value.replace('\r\n', ' ').replace('\n', ' ').strip()
+        if key and value: props.append(f"{key}: {yaml_value(value)}")
+    return props
+
+def inject_frontmatter_lines(lines, props):
+    # 將屬性寫入筆記開頭的 frontmatter；已有 frontmatter 時只補上其中沒有的鍵
+    entries, rest = read_frontmatter(lines)
+    if entries is None: return itertools.chain(["---"], props, ["---"], rest)
+    keys = {key for key, value in entries if key is not None}
+    block = [f"{key}: {yaml_value(value)}" if key is not None else value for key, value in entries]
+    block += [p for p in props if p.split(':', 1)[0] not in keys]
+    return itertools.chain(["---"], block, ["---"], rest)
+
+def inject_frontmatter(text, props):
+    if not props: return text
+    return '\n'.join(inject_frontmatter_lines(text.split('\n'), props))
+
+def dataview_field(name):
+    # 含空白或符號的欄位在 Dataview 中以小寫、空白改為 - 的名稱存取，並以原名顯示
+    if DATAVIEW_FIELD_PATTERN.fullmatch(name): return name
+    return '-'.join(re.sub(r'[^\w\s-]', '', name).lower().split()) + f' AS "{name}"'
+
+def csv_section(rows, name_no_ext, append, db_folder, on_row=None):
+    # 依 csv_mode 逐列產生 Database 索引頁的內容片段，沒有任何資料列時不產生內容
+    # links：每列一個 [[連結]]；table：包含所有欄位的 Markdown 表格；dataview：Dataview 查詢，並以 on_row 將各列屬性寫入對應頁面
+    header = next(rows, None)
+    if header is None: return
+    mode = SETTINGS['csv_mode']
+    started = False
+    for row in rows:
+        if not row: continue
+        name = get_clean_name(row[0])
+        if not name: continue
+        if not started:
+            started = True
+            # 已有同名筆記時附加於其後，否則建立新的索引頁
+            title = "\n\n## Database Items\n" if append else f"# {name_no_ext}\n\n"
+            if mode == 'table':
+                yield title + "| " + " | ".join(table_cell(h) for h in header) + " |\n" + "|" + "---|" * len(header) + "\n"
+            elif mode == 'dataview':
+                columns = ", ".join(dataview_field(h) for h in header[1:] if h.strip())
+                yield title + "```dataview\nTABLE " + columns + f'\nFROM "{db_folder}"\n```\n'
+            else: yield title
+        if mode == 'table':
+            cells = [f"[[{name}]]"] + [table_cell(value) for value in row[1:len(header)]]
+            cells += [''] * (len(header) - len(cells))
+            yield "| " + " | ".join(cells) + " |\n"
+        elif mode == 'dataview':
+            if on_row: on_row(name, header, row)
+        else: yield f"- [[{name}]]\n"
+
+def row_page_lookup(pages):
+    # pages: (頁面路徑, 原始檔名)；回傳 標題 → 頁面路徑清單 (同名頁面依改名計畫的順序)
+    lookup = {}
+    for path, origin in sorted(pages, key=lambda page: page[1]):
+        if origin.endswith('.md'): lookup.setdefault(get_clean_name(origin)[:-3], []).append(path)
+    return lookup
+
+def row_page_writer(db_dir, index=None, written=None):
+    # dataview 模式：回傳 on_row，將資料列屬性寫入 Database 資料夾中對應的頁面；written 清單記錄寫入了屬性的頁面路徑
+    if index is not None and index.exists(db_dir):
+        pages = [(os.path.join(db_dir, name), posixpath.basename(origin or name)) for name, origin in index.node(db_dir).files.items()]
+    elif os.path.isdir(db_dir):
+        pages = [(entry.path, entry.name) for entry in os.scandir(db_dir) if entry.is_file()]
+    else: pages = []
+    lookup = row_page_lookup(pages)
+    def on_row(title, header, row):
+        paths = lookup.get(title)
+        if not paths: return
+        path = paths.pop(0)
+        props = row_frontmatter(header, row)
+        with open(path, 'r', encoding='utf-8') as f: text = f.read()
+        # 先寫入暫存檔再取代，中斷時頁面不會只寫入一半
+        with open(path + '.tmp', 'w', encoding='utf-8') as f: f.write(inject_frontmatter(text, props))
+        os.replace(path + '.tmp', path)
+        if props and written is not None: written.append(path)
+    return on_row
+
+def convert_csv_to_md(file_path, error_list, index=None, row_pages=None):
     try:
         dirname = os.path.dirname(file_path)
         filename = os.path.basename(file_path)
         name_no_ext = os.path.splitext(filename)[0]
         md_filename = name_no_ext + ".md"
         md_path = os.path.join(dirname, md_filename)
+        db_dir = os.path.join(dirname, name_no_ext)
 
-        if os.path.exists(md_path):
-            mode = 'a' 
-            header_text = "\n\n## Database Items\n"
-        else:
-            mode = 'w'
-            header_text = f"# {name_no_ext}\n\n"
-
-        links = []
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as csvfile:
-            reader = csv.reader(csvfile)
-            try: headers = next(reader) 
-            except StopIteration: return 
-            for row in reader:
-                if row:
-                    item_name = row[0]
-                    clean_item_name = get_clean_name(item_name)
-                    if clean_item_name: links.append(f"- [[{clean_item_name}]]")
-        if links:
-            with open(md_path, mode, encoding='utf-8') as md_file:
-                md_file.write(header_text)
-                md_file.write("\n".join(links))
-                md_file.write("\n")
+        append = index.exists(md_path) if index else os.path.exists(md_path)
+        db_folder = os.path.relpath(db_dir, index.root).replace(os.sep, '/') if index else name_no_ext
+        on_row = row_page_writer(db_dir, index, row_pages) if SETTINGS['csv_mode'] == 'dataview' else None
+        # 第一段內容產生後才建立筆記，沒有資料列的 CSV 不會產生空白筆記
+        md_file = None
+        try:
+            for chunk in csv_section(csv_rows(text_opener(file_path)), name_no_ext, append, db_folder, on_row):
+                if md_file is None: md_file = open(md_path, 'a' if append else 'w', encoding='utf-8')
+                md_file.write(chunk)
+        finally:
+            if md_file is not None: md_file.close()
+        if md_file is not None:
+            if index and not append: index.add_file(md_path)
             if SETTINGS['delete_source_csv']:
                 try: os.remove(file_path)
                 except: pass
+                else:
+                    if index: index.remove_file(file_path)
     except Exception as e: error_list.append(f"[CSV 失敗] {os.path.basename(file_path)}: {e}")
 
-def select_and_extract_zip():
+def select_zip_file():
+    import tkinter as tk
+    from tkinter import filedialog
     root = tk.Tk()
     root.withdraw()
     print(">>> 請在彈出的視窗中選擇 Notion 匯出的 ZIP 檔...")
-    zip_path = filedialog.askopenfilename(title="請選擇 Notion 匯出的 ZIP 檔", filetypes=[("Zip files", "*.zip"), ("All files", "*.*")])
-    if not zip_path: return None
+    return filedialog.askopenfilename(title="請選擇 Notion 匯出的 ZIP 檔", filetypes=[("Zip files", "*.zip"), ("All files", "*.*")])
+
+def get_extract_path(zip_path):
     base_dir = os.path.dirname(zip_path)
     zip_name = os.path.splitext(os.path.basename(zip_path))[0]
-    extract_path = os.path.join(base_dir, f"{zip_name}_Obsidian_Ready")
+    return os.path.join(base_dir, f"{zip_name}_Obsidian_Ready")
+
+def member_parts(name):
+    # ZIP 成員名稱 → 相對路徑 parts，清理規則與 ZipFile.extract 相同：
+    # 去除磁碟代號 / UNC 前綴與空白、.、.. 路徑段，Windows 上另外以 _ 取代不合法字元並去除結尾的句點
+    path = name.replace('/', os.sep)
+    if os.altsep: path = path.replace(os.altsep, os.sep)
+    path = os.path.splitdrive(path)[1]
+    path = os.sep.join(p for p in path.split(os.sep) if p not in ('', os.curdir, os.pardir))
+    if os.sep == '\\': path = zipfile.ZipFile._sanitize_windows_name(path, os.sep)
+    return tuple(p for p in path.split(os.sep) if p)
+
+def skipped_member(name):
+    # skip_extensions 中的格式 (例如與 Markdown 重複的 .html) 不解壓縮也不寫入 vault
+    extensions = tuple(ext.strip().lower() for ext in SETTINGS['skip_extensions'].split(',') if ext.strip())
+    return bool(extensions) and name.lower().endswith(extensions)
+
+class ZipMemberSlice:
+    # 外層 ZIP 中未壓縮 (STORED) 成員所在的唯讀區段，可直接當作內部 ZIP 開啟，不需先解壓到磁碟
+    def __init__(self, zip_path, info):
+        self.file = open(zip_path, 'rb')
+        try:
+            self.file.seek(info.header_offset)
+            header = self.file.read(zipfile.sizeFileHeader)
+            if len(header) != zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader: raise zipfile.BadZipFile(f"本機檔頭錯誤: {info.filename}")
+            name_length, extra_length = struct.unpack('<HH', header[26:30])
+        except BaseException:
+            self.file.close()
+            raise
+        self.start = info.header_offset + zipfile.sizeFileHeader + name_length + extra_length
+        self.size = info.compress_size
+        self.pos = 0
+
+    def seekable(self): return True
+    def tell(self): return self.pos
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        self.pos = max(0, (0, self.pos, self.size)[whence] + offset)
+        return self.pos
+
+    def read(self, n=-1):
+        end = self.size if n is None or n < 0 else min(self.size, self.pos + n)
+        if end <= self.pos: return b''
+        self.file.seek(self.start + self.pos)
+        data = self.file.read(end - self.pos)
+        self.pos += len(data)
+        return data
+
+    def close(self): self.file.close()
+
+def open_zip_source(stack, zip_path, source):
+    # source 為 (種類, 參考)：('outer', None) 外層 ZIP、('slice', 成員名稱) 外層中未壓縮的內部 ZIP、('spool', 暫存檔路徑) 已複製出的內部 ZIP
+    kind, ref = source
+    if kind == 'outer': return stack.enter_context(zipfile.ZipFile(zip_path))
+    if kind == 'spool': return stack.enter_context(zipfile.ZipFile(ref))
+    with zipfile.ZipFile(zip_path) as outer: info = outer.getinfo(ref)
+    member = stack.enter_context(contextlib.closing(ZipMemberSlice(zip_path, info)))
+    return stack.enter_context(zipfile.ZipFile(member))
+
+def _extract_members(zip_path, source, members, extract_path):
+    # 行程池工作：寫出同一來源的一批成員 [(成員名稱, 相對路徑 parts)]，以固定大小的緩衝區逐塊複製；回傳 (檔案數, 位元組數)
+    files = size = 0
+    with contextlib.ExitStack() as stack:
+        zf = open_zip_source(stack, zip_path, source)
+        for name, parts in members:
+            info = zf.getinfo(name)
+            with zf.open(info) as src, open(os.path.join(extract_path, *parts), 'wb') as dst: shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+            files += 1
+            size += info.file_size
+    return files, size
+
+def plan_extraction(outer_zip, zip_path, spools):
+    # 回傳 ({相對路徑 parts: (來源, 成員名稱, 大小)}, 資料夾 parts 集合)
+    # 與 extractall 後再展開最上層內部 ZIP 的結果相同：外層成員先，內部 ZIP 依名稱排序，後者覆寫前者；無法開啟的內部 ZIP 保留為一般檔案
+    files = {}
+    dirs = set()
+    def add(source, info):
+        parts = member_parts(info.filename)
+        if not parts: return
+        if info.is_dir(): dirs.add(parts)
+        elif not skipped_member(info.filename): files[parts] = (source, info.filename, info.file_size)
+    inner_infos = []
+    for info in outer_zip.infolist():
+        if '/' not in info.filename and info.filename.lower().endswith('.zip'): inner_infos.append(info)
+        else: add(('outer', None), info)
+    if inner_infos: print(f"偵測到 {len(inner_infos)} 個內部壓縮檔，將直接平行展開...")
+    for info in sorted(inner_infos, key=lambda i: i.filename):
+        try:
+            with contextlib.ExitStack() as stack:
+                if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1: source = ('slice', info.filename)
+                else:
+                    # 壓縮過的內部 ZIP 無法直接定位，先以區塊複製到暫存檔
+                    fd, spool = tempfile.mkstemp(suffix='.zip')
+                    spools.append(spool)
+                    with outer_zip.open(info) as src, open(fd, 'wb') as dst: shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+                    source = ('spool', spool)
+                inner_infos_list = open_zip_source(stack, zip_path, source).infolist()
+        except zipfile.BadZipFile:
+            print(f"  - 警告: 無法解壓 {info.filename}")
+            add(('outer', None), info)
+            continue
+        for inner_info in inner_infos_list: add(source, inner_info)
+    return files, dirs
+
+def extraction_tasks(files, jobs):
+    # 依來源分組後以累計大小切成多批，大的批次先送出；每批由一個行程開啟來源一次
+    groups = {}
+    for parts, (source, name, size) in files.items(): groups.setdefault(source, []).append((name, parts, size))
+    target = max(STREAM_CHUNK_SIZE * 16, sum(size for source, name, size in files.values()) // max(1, jobs * 4))
+    tasks = []
+    for source, members in groups.items():
+        batch, batch_size = [], 0
+        for name, parts, size in members:
+            batch.append((name, parts))
+            batch_size += size
+            if batch_size >= target or len(batch) >= 4096:
+                tasks.append((batch_size, source, batch))
+                batch, batch_size = [], 0
+        if batch: tasks.append((batch_size, source, batch))
+    tasks.sort(key=lambda task: task[0], reverse=True)
+    return tasks
+
+def extract_zip(zip_path, extract_path, error_list=None):
+    # 回傳解壓後建立的檔案索引，失敗或取消時回傳 None；失敗原因 (ZIP 無效、磁碟空間不足) 記錄於 error_list
+    # 內部 ZIP 不先寫到磁碟：未壓縮者直接從外層 ZIP 讀取，各來源的成員切成多批由 workers 個行程平行寫出
     if not os.path.exists(extract_path): os.makedirs(extract_path)
     print(f"正在解壓縮至: {extract_path}")
+    spools = []
     try:
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref: zip_ref.extractall(extract_path)
-        inner_items = os.listdir(extract_path)
-        inner_zips = [f for f in inner_items if f.lower().endswith('.zip')]
-        if inner_zips:
-            print(f"偵測到 {len(inner_zips)} 個內部壓縮檔，正在展開並清理...")
-            for zf in inner_zips:
-                zf_full_path = os.path.join(extract_path, zf)
-                try:
-                    with zipfile.ZipFile(zf_full_path, 'r') as inner_zip_ref:
-                        inner_zip_ref.extractall(extract_path)
-                    os.remove(zf_full_path) 
-                except zipfile.BadZipFile: print(f"  - 警告: 無法解壓 {zf}")
-        has_content = False
-        for root, dirs, files in os.walk(extract_path):
-            if any(f.lower().endswith(('.md', '.csv')) for f in files): has_content = True; break
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref: files, dirs = plan_extraction(zip_ref, zip_path, spools)
+        needed = sum(size for source, name, size in files.values())
+        free = shutil.disk_usage(extract_path).free
+        if needed > free:
+            message = f"磁碟空間不足：解壓縮需要 {needed / 1024 ** 3:.2f} GB，{extract_path} 所在磁碟只剩 {free / 1024 ** 3:.2f} GB"
+            show_message("錯誤", message + "。", error=True)
+            if error_list is not None: error_list.append(f"[ZIP 失敗] {os.path.basename(zip_path)}: {message}")
+            return None
+        for parts in dirs | {parts[:-1] for parts in files}: os.makedirs(os.path.join(extract_path, *parts), exist_ok=True)
+        workers = SETTINGS['workers']
+        tasks = extraction_tasks(files, workers)
+        with contextlib.ExitStack() as stack:
+            if workers > 1 and len(tasks) > 1:
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+                results = [(source, executor.submit(_extract_members, zip_path, source, batch, extract_path)) for size, source, batch in tasks]
+                results = [(source, future.result) for source, future in results]
+            else: results = [(source, functools.partial(_extract_members, zip_path, source, batch, extract_path)) for size, source, batch in tasks]
+            failed = set()
+            for source, result in results:
+                try: STATS.add_files('extract', *result())
+                except zipfile.BadZipFile:
+                    if source not in failed: print(f"  - 警告: 無法解壓 {os.path.basename(source[1] or zip_path)}")
+                    failed.add(source)
+        index = FileIndex(extract_path)
+        has_content = any(name.lower().endswith(('.md', '.csv')) for path, node in index.walk() for name in node.files)
         if not has_content:
-            if not messagebox.askyesno("警告", "目標資料夾沒有 .md 筆記，是否繼續？"): return None
-        return extract_path
-    except zipfile.BadZipFile: messagebox.showerror("錯誤", "無效的 ZIP 檔案。"); return None
+            if not ask_yes_no("警告", "目標資料夾沒有 .md 筆記，是否繼續？"): return None
+        return index
+    except zipfile.BadZipFile:
+        show_message("錯誤", "無效的 ZIP 檔案。", error=True)
+        if error_list is not None: error_list.append(f"[ZIP 失敗] {os.path.basename(zip_path)}: 無效的 ZIP 檔案")
+        return None
+    finally:
+        for spool in spools: os.remove(spool)
+
+# ================= SQLite 索引 =================
+
+# 目前串流轉換寫入的 SQLite 索引 (僅主行程)；未啟用 sqlite_index 時為 None
+VAULT_INDEX = None
+
+def index_db_path(target_dir):
+    return os.path.join(os.path.dirname(target_dir), INDEX_DB_FILE)
+
+class VaultIndex:
+    # 轉換時建立的 vault 索引：筆記、YAML 屬性、Tags、連結 (含最終 vault 路徑) 與 FTS5 全文索引
+    # 資料來自步驟 3 的同一次解析，不再重新讀取筆記；每 INDEX_BATCH 篇提交一次交易
+    # keep 為 False 時重新建立資料庫；同一路徑再次寫入時覆寫舊資料 (續傳與增量轉換)
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS pages (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, title TEXT NOT NULL, has_body INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS properties (page_id INTEGER NOT NULL, key TEXT NOT NULL, value TEXT)",
+        "CREATE TABLE IF NOT EXISTS tags (page_id INTEGER NOT NULL, tag TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS links (page_id INTEGER NOT NULL, label TEXT, url TEXT NOT NULL, target TEXT)",
+        "CREATE INDEX IF NOT EXISTS properties_key ON properties (key, value)",
+        "CREATE INDEX IF NOT EXISTS properties_page ON properties (page_id)",
+        "CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag)",
+        "CREATE INDEX IF NOT EXISTS tags_page ON tags (page_id)",
+        "CREATE INDEX IF NOT EXISTS links_target ON links (target)",
+        "CREATE INDEX IF NOT EXISTS links_page ON links (page_id)",
+    )
+
+    def __init__(self, path, link_index=None, keep=False):
+        self.path = path
+        self.link_index = link_index
+        self.pending = 0
+        if not keep:
+            for suffix in ('', '-wal', '-shm', '-journal'):
+                if os.path.exists(path + suffix): os.remove(path + suffix)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        for statement in self.SCHEMA: self.db.execute(statement)
+        try:
+            # 全文索引的 rowid 即 pages.id
+            self.db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5 (title, body)")
+            self.fts = True
+        except sqlite3.OperationalError:
+            print("警告: 此 Python 的 SQLite 不支援 FTS5，索引將不含全文搜尋。")
+            self.fts = False
+        self.db.commit()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    def add(self, note_path, page):
+        self.remove(note_path)
+        title = posixpath.splitext(posixpath.basename(note_path))[0]
+        page_id = self.db.execute("INSERT INTO pages (path, title, has_body) VALUES (?, ?, ?)", (note_path, title, page['body'] is not None)).lastrowid
+        self.db.executemany("INSERT INTO properties VALUES (?, ?, ?)", [(page_id, key, value) for key, value in page['properties']])
+        self.db.executemany("INSERT INTO tags VALUES (?, ?)", [(page_id, tag) for tag in page['tags']])
+        target = (lambda url: self.link_index.target(note_path, url)) if self.link_index else (lambda url: None)
+        self.db.executemany("INSERT INTO links VALUES (?, ?, ?, ?)", [(page_id, label, url, None if url.startswith("about:blank") else target(url)) for label, url in page['links']])
+        if self.fts: self.db.execute("INSERT INTO pages_fts (rowid, title, body) VALUES (?, ?, ?)", (page_id, title, page['body'] or ''))
+        self.pending += 1
+        if self.pending >= INDEX_BATCH: self.commit()
 
-def process_renaming(target_dir):
+    def remove(self, note_path):
+        row = self.db.execute("SELECT id FROM pages WHERE path = ?", (note_path,)).fetchone()
+        if row is None: return
+        for table in ('properties', 'tags', 'links'): self.db.execute(f"DELETE FROM {table} WHERE page_id = ?", row)
+        if self.fts: self.db.execute("DELETE FROM pages_fts WHERE rowid = ?", row)
+        self.db.execute("DELETE FROM pages WHERE id = ?", row)
+
+    def commit(self):
+        self.db.commit()
+        self.pending = 0
+
+    def close(self):
+        if self.db is None: return
+        self.commit()
+        count = self.db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        self.db.close()
+        self.db = None
+        print(f"已儲存 SQLite 索引至: {self.path} ({count} 篇筆記)")
+
+def index_note(note_path, page, body):
+    # 串流轉換的筆記寫入索引；page 為 None 時 (只有全文) 建立空的索引資料
+    if VAULT_INDEX is None: return
+    if page is None: page = new_page()
+    page['body'] = body
+    VAULT_INDEX.add(note_path, page)
+
+# ================= 串流轉換 (不預先解壓縮) =================
+
+def _open_inner_zip(outer_zip, info):
+    # 未壓縮 (STORED) 的內部 ZIP 以 ZipMemberSlice 直接在外層 ZIP 中讀取，與解壓縮模式相同不另寫一份
+    # 壓縮過或加密的內部 ZIP 無法直接定位 (ZipExtFile 向後 seek 會從頭重新解壓)，先以區塊複製到暫存檔再開啟
+    if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1 and outer_zip.filename: spool = ZipMemberSlice(outer_zip.filename, info)
+    else:
+        spool = tempfile.TemporaryFile()
+        try:
+            with outer_zip.open(info) as src: shutil.copyfileobj(src, spool, STREAM_CHUNK_SIZE)
+            spool.seek(0)
+        except BaseException:
+            spool.close()
+            raise
+    try: return zipfile.ZipFile(spool, 'r'), spool
+    except Exception:
+        spool.close()
+        raise
+
+def collect_zip_members(outer_zip, opened):
+    # 依 extractall 的覆寫順序收集成員：外層成員先，最上層的內部 ZIP 後
+    members = {}
+    inner_infos = []
+    for info in outer_zip.infolist():
+        if '/' not in info.filename and info.filename.lower().endswith('.zip'): inner_infos.append(info)
+        elif not skipped_member(info.filename): members[info.filename] = (outer_zip, info)
+    if inner_infos: print(f"偵測到 {len(inner_infos)} 個內部壓縮檔，將直接串流讀取...")
+    for info in sorted(inner_infos, key=lambda i: i.filename):
+        try: inner_zip, spool = _open_inner_zip(outer_zip, info)
+        except zipfile.BadZipFile: print(f"  - 警告: 無法解壓 {info.filename}"); continue
+        opened.append((inner_zip, spool))
+        for inner_info in inner_zip.infolist():
+            if not skipped_member(inner_info.filename): members[inner_info.filename] = (inner_zip, inner_info)
+    return members
+
+class RenamePlan:
+    # 改名計畫：先在記憶體中算出完整的 舊名 → 新名 對照，再一次依序套用
+    # 同一資料夾內先檔案後資料夾、各依名稱排序；清洗後同名時依序加上 " (2)"、" (3)" 後綴，結果與走訪順序無關
+    # 名稱比對不分大小寫，避免在 Windows / macOS 上互相覆蓋
+    def __init__(self, file_parts, dir_parts):
+        children = {}
+        def register(parts, is_dir):
+            for i in range(len(parts)):
+                entry = children.setdefault(parts[:i], (set(), set()))
+                if i < len(parts) - 1 or is_dir: entry[1].add(parts[i])
+                else: entry[0].add(parts[i])
+        for parts in dir_parts: register(parts, True)
+        for parts in file_parts: register(parts, False)
+        self.renamed = {}
+        self.reverse = None
+        for parent, (files, dirs) in children.items():
+            taken = {name.lower() for name in files | dirs}
+            for name in sorted(n for n in files if n.endswith(RENAME_EXTENSIONS)): self._assign(parent, name, taken, True)
+            for name in sorted(dirs): self._assign(parent, name, taken, False)
+
+    def _assign(self, parent, name, taken, is_file):
+        new_name = get_clean_name(name)
+        if new_name == name: return
+        stem, ext = os.path.splitext(new_name) if is_file else (new_name, '')
+        candidate = new_name
+        suffix = 1
+        while candidate.lower() in taken:
+            suffix += 1
+            candidate = f"{stem} ({suffix}){ext}"
+        taken.add(candidate.lower())
+        self.renamed[(parent, name)] = candidate
+
+    def final(self, parts):
+        return tuple(self.renamed.get((parts[:i], name), name) for i, name in enumerate(parts))
+
+    def origin(self, parts):
+        # final 的反向：由改名後的路徑片段推回原始路徑片段
+        if self.reverse is None: self.reverse = {(self.final(parent), new_name): name for (parent, name), new_name in self.renamed.items()}
+        return tuple(self.reverse.get((parts[:i], name), name) for i, name in enumerate(parts))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f: data = json.load(f)
+        plan = cls((), ())
+        for parent, name, new_name in data['renames']: plan.renamed[(tuple(p for p in parent.split('/') if p), name)] = new_name
+        return plan
+
+    def entries(self):
+        # 套用順序：較深的資料夾先處理，父資料夾改名前其內容的路徑仍有效
+        return [(parent, name, new_name) for (parent, name), new_name in sorted(self.renamed.items(), key=lambda item: -len(item[0][0]))]
+
+    def save(self, path, root):
+        plan = {'version': 1, 'root': os.path.abspath(root), 'renames': [['/'.join(parent), name, new_name] for parent, name, new_name in self.entries()]}
+        with open(path, 'w', encoding='utf-8') as f: json.dump(plan, f, ensure_ascii=False)
+
+def _write_text(path, text, mode='w'):
+    with open(path, mode, encoding='utf-8') as f: f.write(text)
+
+def stream_zip_to_vault(zip_path, extract_path, error_list, incremental=False):
+    # 直接從 ZIP 讀取成員，於記憶體中完成改名、CSV 合併與內容修復，每個檔案只寫入一次 (Database 索引頁先逐列寫入再修復)
+    global LINK_INDEX, VAULT_INDEX
+    opened = []
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as outer_zip:
+            entries = {}
+            dir_parts = set()
+            for name, (zf, info) in collect_zip_members(outer_zip, opened).items():
+                parts = member_parts(name)
+                if not parts: continue
+                if info.is_dir(): dir_parts.add(parts)
+                else: entries[parts] = (zf, info)
+            if not any(parts[-1].lower().endswith(('.md', '.csv')) for parts in entries):
+                if not ask_yes_no("警告", "ZIP 檔中沒有 .md 筆記，是否繼續？"): return None
+
+            plan = RenamePlan(entries.keys(), dir_parts)
+            write_rename_plan(extract_path, plan)
+            final = plan.final
+            files = {'/'.join(final(parts)): member for parts, member in entries.items()}
+            asset_targets = {}
+            if SETTINGS['move_assets']:
+                # 附件去重：ZIP 中央目錄已記錄大小與 CRC32，只有兩者皆相同的附件才需解壓計算 SHA-1
+                def digest(path):
+                    zf, info = files[path]
+                    with zf.open(info) as f: return file_sha1(f)
+                assets = AssetPlan([(path, info.file_size, info.CRC) for path, (zf, info) in files.items()], digest, max(SETTINGS['workers'], SETTINGS['io_threads']))
+                asset_targets = assets.targets
+                for path, target in asset_targets.items():
+                    member = files.pop(path)
+                    if assets.sources[target] == path: files[target] = member
+                STATS.assets = assets.summary()
+                print_asset_summary(STATS.assets)
+            link_index = LinkIndex(extract_path, (('/'.join(parts), asset_targets.get('/'.join(final(parts)), '/'.join(final(parts)))) for parts in entries))
+
+            # CSV 智慧合併：沒有目前檢視的 _all.csv 直接改名；兩者皆有時於轉換單位中逐列合併
+            for path in [p for p in files if p.endswith('.csv') and p.lower().endswith('_all.csv')]:
+                original = path[:-8] + ".csv"
+                if original not in files: files[original] = files.pop(path)
+
+            # 筆記與同名 CSV (含 _all.csv) 為同一轉換單位 (CSV 索引會附加到筆記)
+            units = {}
+            for path, member in files.items():
+                if path.endswith('.csv'): key = (path[:-8] if path.lower().endswith('_all.csv') else path[:-4]) + ".md"
+                else: key = path
+                units.setdefault(key, {})[path] = member
+
+            database = None
+            if SETTINGS['csv_mode'] == 'dataview':
+                # 資料列頁面的 frontmatter 來自 Database CSV：CSV 列入頁面的來源雜湊，並記錄各 Database 資料夾中的頁面
+                database = {'pages': {}, 'frontmatter': {}}
+                for parts in entries:
+                    path = '/'.join(final(parts))
+                    if not path.endswith('.md'): continue
+                    folder = posixpath.dirname(path)
+                    database['pages'].setdefault(folder, []).append((path, parts[-1]))
+                    for csv_path in (folder + ".csv", folder + "_all.csv"):
+                        if folder and csv_path in files: units[path][csv_path] = files[csv_path]
+
+            prev_units, reuse, prev_links = load_manifest(extract_path) if incremental else ({}, False, None)
+            if reuse and SETTINGS['sqlite_index'] and not os.path.exists(index_db_path(extract_path)):
+                print("找不到上次的 SQLite 索引，將完整轉換。")
+                reuse = False
+            links = link_index.digest()
+            if reuse and prev_links != links: print("連結對應已變更，將重新轉換所有筆記。")
+            manifest_units = {}
+            dirty = []
+            for key in sorted(units):
+                sources = {info.filename: member_hash(info) for zf, info in units[key].values()}
+                prev = prev_units.get(key)
+                if key.endswith('.md') and prev_links != links: prev = None
+                if reuse and prev and prev['sources'] == sources and all(os.path.exists(os.path.join(extract_path, *out.split('/'))) for out in prev['outputs']):
+                    manifest_units[key] = prev
+                else: dirty.append((key, sources))
+            if database:
+                # 只更新某個資料列頁面時，仍需重新讀取其 Database CSV 才能產生 frontmatter
+                dirty_keys = {key for key, sources in dirty}
+                for key in list(dirty_keys):
+                    db_key = posixpath.dirname(key) + ".md"
+                    if db_key not in dirty_keys and db_key in manifest_units and any(p.endswith('.csv') for p in units[db_key]):
+                        dirty_keys.add(db_key)
+                        del manifest_units[db_key]
+                        dirty.append((db_key, {info.filename: member_hash(info) for zf, info in units[db_key].values()}))
+                dirty.sort()
+
+            os.makedirs(extract_path, exist_ok=True)
+            for parts in dir_parts: os.makedirs(os.path.join(extract_path, *final(parts)), exist_ok=True)
+            print(f"正在寫入: {extract_path}")
+            total = len(dirty)
+            processed_count = 0
+            print_progress(0, total, prefix='進度:', suffix='完成', length=40)
+            LINK_INDEX = link_index
+            if SETTINGS['sqlite_index']: VAULT_INDEX = VaultIndex(index_db_path(extract_path), link_index, keep=reuse)
+            for i, (key, sources) in enumerate(dirty):
+                start = time.perf_counter()
+                outputs = stream_unit(units[key], key, extract_path, error_list, database)
+                STATS.add_file('stream', key, sum(info.file_size for zf, info in units[key].values()), time.perf_counter() - start)
+                if outputs.pop(0): processed_count += 1
+                manifest_units[key] = {'sources': sources, 'outputs': outputs}
+                if key in prev_units:
+                    stale = set(prev_units[key]['outputs']) - set(outputs)
+                    remove_outputs(extract_path, stale)
+                    if VAULT_INDEX is not None:
+                        for path in stale: VAULT_INDEX.remove(path)
+                # 中途儲存轉換清單，中斷後以 --resume (增量轉換) 只處理尚未完成的項目；索引先提交，清單中的項目必定已在索引中
+                if SETTINGS['checkpoint'] and (i + 1) % CHECKPOINT_BATCH == 0:
+                    if VAULT_INDEX is not None: VAULT_INDEX.commit()
+                    save_manifest(extract_path, manifest_units, links)
+                print_progress(i + 1, total, prefix='進度:', suffix='完成', length=40)
+
+            # 上游已刪除的頁面與附件
+            removed = [out for key, unit in prev_units.items() if key not in units for out in unit['outputs']]
+            remove_outputs(extract_path, removed)
+            if VAULT_INDEX is not None:
+                for path in removed: VAULT_INDEX.remove(path)
+            if incremental:
+                print(f"增量轉換：略過 {len(units) - len(dirty)} 個未變更項目，更新 {len(dirty)} 個，刪除 {len(removed)} 個檔案。")
+            if VAULT_INDEX is not None: VAULT_INDEX.close()
+            save_manifest(extract_path, manifest_units, links)
+            print_prefilter_summary(STATS.prefilter)
+            return processed_count
+    except zipfile.BadZipFile:
+        show_message("錯誤", "無效的 ZIP 檔案。", error=True)
+        error_list.append(f"[ZIP 失敗] {os.path.basename(zip_path)}: 無效的 ZIP 檔案")
+        return None
+    finally:
+        LINK_INDEX = None
+        if VAULT_INDEX is not None: VAULT_INDEX.close()
+        VAULT_INDEX = None
+        for inner_zip, spool in opened:
+            inner_zip.close(); spool.close()
+
+def stream_unit(members, key, extract_path, error_list, database=None):
+    # 寫入一個轉換單位，回傳 [是否修改筆記, 輸出路徑...]
+    def out_path(path):
+        full = os.path.join(extract_path, *path.split('/'))
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        return full
+    def copy_member(path):
+        zf, info = members[path]
+        with zf.open(info) as src, open(out_path(path), 'wb') as dst: shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+        outputs.append(path)
+    def member_opener(path):
+        zf, info = members[path]
+        return lambda: io.TextIOWrapper(zf.open(info), encoding='utf-8', errors='ignore', newline='')
+
+    outputs = [False]
+    try:
+        if not key.endswith('.md'):
+            copy_member(key)
+            return outputs
+        md_member = members.get(key)
+        csv_path = key[:-3] + ".csv"
+        all_path = next((p for p in members if p.lower() == csv_path[:-4].lower() + "_all.csv"), None)
+        props = database['frontmatter'].pop(key, None) if database is not None else None
+        written = False  # 已寫入含 Database 區段的筆記，待修復
+        if csv_path in members:
+            keep_csv = True
+            rows = lambda: merge_csv_rows(member_opener(all_path), member_opener(csv_path)) if all_path else csv_rows(member_opener(csv_path))
+            try:
+                on_row = None
+                if database is not None:
+                    lookup = row_page_lookup(database['pages'].get(key[:-3], []))
+                    def on_row(title, header, row):
+                        paths = lookup.get(title)
+                        if paths: database['frontmatter'][paths.pop(0)] = row_frontmatter(header, row)
+                section = csv_section(rows(), os.path.basename(csv_path[:-4]), md_member is not None, key[:-3], on_row)
+                first = next(section, None)
+                if first is not None:
+                    written = True
+                    write_database_note(md_member, itertools.chain([first], section), out_path(key), props)
+                    keep_csv = not SETTINGS['delete_source_csv']
+            except Exception as e: error_list.append(f"[CSV 失敗] {os.path.basename(csv_path)}: {e}")
+            if keep_csv:
+                if all_path:
+                    write_csv_rows(rows(), out_path(csv_path))
+                    outputs.append(csv_path)
+                else: copy_member(csv_path)
+        if written:
+            outputs[0] = repair_database_note(out_path(key), error_list, key, props)
+            outputs.append(key)
+        elif md_member:
+            outputs[0] = stream_markdown_member(md_member, out_path(key), error_list, key, props)
+            outputs.append(key)
+    except Exception as e: error_list.append(f"[寫入失敗] {key}: {e}")
+    return outputs
+
+def member_hash(info):
+    # ZIP 中央目錄已記錄 CRC32 與大小，不需解壓即可判斷內容是否變更
+    return f"{info.CRC:08x}-{info.file_size}"
+
+def load_manifest(vault_dir):
+    # 回傳 (上次的轉換單位, 是否可沿用, 上次的連結對應摘要)；設定變更時仍回傳舊清單以便清除過期檔案
+    path = os.path.join(vault_dir, MANIFEST_FILE)
+    if not os.path.exists(path): return {}, False, None
+    try:
+        with open(path, 'r', encoding='utf-8') as f: manifest = json.load(f)
+    except Exception as e:
+        print(f"轉換清單讀取錯誤，將完整轉換: {e}")
+        return {}, False, None
+    if manifest.get('settings') != {k: SETTINGS[k] for k in MANIFEST_SETTINGS}:
+        print("轉換設定已變更，將完整轉換。")
+        return manifest.get('units', {}), False, None
+    return manifest.get('units', {}), True, manifest.get('links')
+
+def save_manifest(vault_dir, units, links=None):
+    path = os.path.join(vault_dir, MANIFEST_FILE)
+    manifest = {'version': 1, 'settings': {k: SETTINGS[k] for k in MANIFEST_SETTINGS}, 'links': links, 'units': units}
+    with open(path + '.tmp', 'w', encoding='utf-8') as f: json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def remove_outputs(vault_dir, paths):
+    vault_dir = os.path.abspath(vault_dir)
+    for path in paths:
+        full = os.path.join(vault_dir, *path.split('/'))
+        try: os.remove(full)
+        except FileNotFoundError: pass
+        # 一併移除因此變空的資料夾
+        parent = os.path.dirname(full)
+        while parent != vault_dir and os.path.isdir(parent) and not os.listdir(parent):
+            os.rmdir(parent)
+            parent = os.path.dirname(parent)
+
+def write_database_note(member, section, out_path, props=None):
+    # 與解壓縮模式相同：先寫入筆記 (含資料列屬性)，再逐段附加 Database 區段；大型表格不會整份留在記憶體
+    if props:
+        with (io.TextIOWrapper(member[0].open(member[1]), encoding='utf-8') if member else io.StringIO()) as src, open(out_path, 'w', encoding='utf-8') as dst:
+            for i, line in enumerate(inject_frontmatter_lines(iter_text_lines(src), props)):
+                if i: dst.write('\n')
+                dst.write(line)
+    elif member:
+        with member[0].open(member[1]) as src, open(out_path, 'wb') as dst: shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+    with open(out_path, 'a' if props or member else 'w', encoding='utf-8') as dst:
+        for chunk in section: dst.write(chunk)
+
+def repair_database_note(out_path, error_list, note_path=None, props=None):
+    # 以步驟 3 的 repair_markdown_file 修復 write_database_note 寫出的筆記 (依大小選擇串流路徑)，回傳是否修改
+    changed, error, nbytes, seconds, dangling, needs, page = repair_markdown_file(out_path, merge_front=bool(props))
+    if error: error_list.append(error); return False
+    if needs is not None: STATS.add_note_needs(needs)
+    if dangling: STATS.add_dangling(note_path, dangling)
+    index_note(note_path, page, page['body'] if page else None)
+    return changed
+
+def stream_markdown_member(member, out_path, error_list, note_path=None, props=None):
+    # 回傳是否經 clean_content 修改；輸出與「解壓縮 → 寫入資料列屬性 → 步驟 3」完全相同 (含 Database 區段的筆記見 write_database_note)
+    if stream_threshold() and member[1].file_size >= stream_threshold():
+        return stream_large_member(member, out_path, error_list, note_path, props)
+    zf, info = member
+    raw = zf.read(info)
+    if SETTINGS['prefilter'] and not props:
+        needs = note_triggers(raw)
+        STATS.add_note_needs(needs)
+        if not needs:
+            with open(out_path, 'wb') as f: f.write(raw)
+            index_note(note_path, None, raw.decode('utf-8', 'replace').replace('\r\n', '\n').replace('\r', '\n'))
+            return False
+    try:
+        # 與文字模式讀檔相同，統一換行符號
+        content = inject_frontmatter(raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n'), props)
+        replace_link, dangling = note_link_replacer(note_path)
+        page = new_page() if VAULT_INDEX is not None else None
+        new_content = clean_content(content, replace_link, page, bool(props))
+        if dangling: STATS.add_dangling(note_path, dangling)
+        index_note(note_path, page, new_content)
+    except Exception as e:
+        error_list.append(f"[筆記失敗] {os.path.basename(out_path)}: {e}")
+        new_content = content = None
+    if new_content is not None and (new_content != content or props):
+        _write_text(out_path, new_content)
+    else:
+        with open(out_path, 'wb') as f: f.write(raw)
+    return new_content is not None and new_content != content
+
+def stream_large_member(member, out_path, error_list, note_path=None, props=None):
+    # stream_markdown_member 的大型筆記版本：逐行解壓與清洗，輸出相同但不把整份筆記讀入記憶體
+    zf, info = member
+    try:
+        replace_link, dangling = note_link_replacer(note_path)
+        with io.TextIOWrapper(zf.open(info), encoding='utf-8') as f:
+            lines = iter_text_lines(f)
+            if props: lines = inject_frontmatter_lines(lines, props)
+            page = new_page() if VAULT_INDEX is not None else None
+            changed, tmp_path = clean_stream(lines, out_path, replace_link, page, bool(props))
+        if dangling: STATS.add_dangling(note_path, dangling)
+        index_note(note_path, page, None)
+    except Exception as e:
+        error_list.append(f"[筆記失敗] {os.path.basename(out_path)}: {e}")
+        changed = tmp_path = None
+    if tmp_path and (changed or props):
+        os.replace(tmp_path, out_path)
+        return changed
+    if tmp_path: os.remove(tmp_path)
+    with zf.open(info) as src, open(out_path, 'wb') as dst: shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+    return False
+
+def process_renaming(target_dir, index=None, error_list=None, checkpoint=None):
+    # 依 RenamePlan 一次套用所有改名；計畫已排除與既有名稱衝突的目標，不需逐一檢查是否存在
+    # 續傳時沿用上次寫出的改名計畫並略過已完成的深度；中斷於某一深度時，其中已改名的項目視為完成
     print("步驟 1/4: 清洗檔案與資料夾名稱...")
-    all_files = []
-    all_dirs = []
-    for dirpath, dirnames, filenames in os.walk(target_dir, topdown=False):
-        for name in filenames:
-            if name.endswith(('.md', '.csv', '.png', '.jpg', '.jpeg', '.pdf', '.html')):
-                all_files.append((dirpath, name))
-        for name in dirnames: all_dirs.append((dirpath, name))
-    total_ops = len(all_files) + len(all_dirs)
-    current_op = 0
+    if index is None: index = FileIndex(target_dir)
+    if checkpoint is None: checkpoint = Checkpoint()
+    plan_path = rename_plan_path(target_dir)
+    resumed = bool(checkpoint.find('rename', 'planned')) and os.path.exists(plan_path)
+    if resumed: plan = RenamePlan.load(plan_path)
+    else:
+        plan = RenamePlan(*index.parts())
+        write_rename_plan(target_dir, plan)
+        checkpoint.log('rename', planned=True)
+    finished = {record['depth']: record['errors'] for record in checkpoint.records.get('rename', ()) if 'depth' in record}
+    entries = plan.entries()
+    total_ops = len(entries)
     print_progress(0, total_ops, prefix='進度:', suffix='完成', length=40)
-    for dirpath, name in all_files:
-        new_name = get_clean_name(name)
-        if new_name != name:
-            old_path = os.path.join(dirpath, name)
-            new_path = os.path.join(dirpath, new_name)
-            if not os.path.exists(new_path): os.rename(old_path, new_path)
-        current_op += 1
-        print_progress(current_op, total_ops, prefix='進度:', suffix='完成', length=40)
-    for dirpath, name in all_dirs:
-        new_name = get_clean_name(name)
-        if new_name != name:
-            old_path = os.path.join(dirpath, name)
-            new_path = os.path.join(dirpath, new_name)
-            if not os.path.exists(new_path): os.rename(old_path, new_path)
-        current_op += 1
-        print_progress(current_op, total_ops, prefix='進度:', suffix='完成', length=40)
-
-def compress_folder_to_zip(folder_path):
+    def apply(entry):
+        parent, name, new_name = entry
+        dirpath = os.path.join(target_dir, *parent)
+        src, dst = os.path.join(dirpath, name), os.path.join(dirpath, new_name)
+        try: os.rename(src, dst)
+        except OSError as e:
+            if resumed and not os.path.exists(src) and os.path.exists(dst): return None
+            return e
+        return None
+    done = 0
+    # 同一深度的改名互不影響 (新名稱不會與任何既有名稱相同)，可以平行；各深度依序由深至淺套用
+    for depth, group in itertools.groupby(entries, key=lambda entry: len(entry[0])):
+        group = list(group)
+        if depth in finished:
+            if error_list is not None: error_list.extend(finished[depth])
+            done += len(group)
+            continue
+        errors = []
+        for (parent, name, new_name), error in zip(group, io_map(apply, group)):
+            if error is None:
+                node = index.node(os.path.join(target_dir, *parent))
+                if name in node.files or name in node.dirs: index.rename_entry(node, name, new_name)
+            else: errors.append(f"[改名失敗] {name}: {error}")
+            STATS.add_file('rename', name)
+            done += 1
+            print_progress(done, total_ops, prefix='進度:', suffix='完成', length=40)
+        if error_list is not None: error_list.extend(errors)
+        checkpoint.log('rename', depth=depth, errors=errors)
+    return plan
+
+def restore_origins(index, plan):
+    # 續傳時檔案索引為重新掃描，依改名計畫推回每個檔案在匯出中的原始路徑 (連結索引與 Database 資料列對應需要)
+    stack = [((), index.tree)]
+    while stack:
+        parts, node = stack.pop()
+        for name in node.files: node.files[name] = '/'.join(plan.origin(parts + (name,)))
+        for name, child in node.dirs.items(): stack.append((parts + (name,), child))
+
+def rename_plan_path(target_dir):
+    return os.path.join(os.path.dirname(target_dir), RENAME_PLAN_FILE)
+
+def write_rename_plan(target_dir, plan):
+    # 改名計畫與錯誤日誌放在同一資料夾，可供 --undo-renames 還原
+    plan_path = rename_plan_path(target_dir)
+    plan.save(plan_path, target_dir)
+    return plan_path
+
+def undo_renames(plan_path):
+    # 依改名計畫的相反順序還原名稱；回傳 (還原數量, 略過數量, 錯誤清單)
+    # 改名後被合併或刪除的檔案 (例如 _all.csv、已轉換的 CSV) 不存在時略過
+    with open(plan_path, 'r', encoding='utf-8') as f: plan = json.load(f)
+    restored = 0
+    skipped = 0
+    errors = []
+    for parent, name, new_name in reversed(plan['renames']):
+        dirpath = os.path.join(plan['root'], *[p for p in parent.split('/') if p])
+        try:
+            os.rename(os.path.join(dirpath, new_name), os.path.join(dirpath, name))
+            restored += 1
+        except FileNotFoundError: skipped += 1
+        except OSError as e: errors.append(f"[還原失敗] {new_name}: {e}")
+    return restored, skipped, errors
+
+class AssetPlan:
+    # move_assets 的附件計畫：相同內容的附件只在附件資料夾保留一份，檔名沿用依路徑排序第一個出現者
+    # 只有大小 (及串流模式下 ZIP 記錄的 CRC32) 相同的附件才需讀取內容計算 SHA-1，由執行緒平行處理
+    # 附件資料夾中原有的附件保留原名，其他同名不同內容者依序加上 " (2)"、" (3)" 後綴
+    def __init__(self, files, digest, threads=1):
+        # files 為所有檔案的 [(vault 路徑, 大小, CRC32 或 None)]；digest(vault 路徑) 回傳內容的 SHA-1
+        folder = SETTINGS['attachments_folder'].strip('/')
+        prefix = folder + '/'
+        assets = []
+        taken = set()
+        for path, size, crc in files:
+            is_asset = path.lower().endswith(ASSET_EXTENSIONS)
+            if path.startswith(prefix):
+                rest = path[len(prefix):]
+                if '/' in rest: taken.add(rest.split('/')[0].lower())
+                elif not is_asset: taken.add(rest.lower())
+            if is_asset: assets.append((not path.startswith(prefix) or '/' in path[len(prefix):], path, size, crc))
+        assets.sort()
+        groups = collections.Counter((size, crc) for _, path, size, crc in assets)
+        candidates = [path for _, path, size, crc in assets if groups[(size, crc)] > 1]
+        results = ordered_io_map(digest, candidates, threads, threads * 4) if threads > 1 and len(candidates) > 1 else map(digest, candidates)
+        digests = dict(zip(candidates, results))
+
+        self.targets = {}  # 附件原路徑 → 附件資料夾中的路徑
+        self.sources = {}  # 附件資料夾中的路徑 → 保留內容的原路徑
+        self.hashed = len(candidates)
+        self.duplicates = 0
+        self.saved_bytes = 0
+        blobs = {}
+        for _, path, size, crc in assets:
+            blob = (size, digests[path]) if path in digests else path
+            target = blobs.get(blob)
+            if target is not None:
+                self.duplicates += 1
+                self.saved_bytes += size
+            else:
+                stem, ext = os.path.splitext(posixpath.basename(path))
+                candidate = stem + ext
+                suffix = 1
+                while candidate.lower() in taken:
+                    suffix += 1
+                    candidate = f"{stem} ({suffix}){ext}"
+                taken.add(candidate.lower())
+                target = blobs[blob] = prefix + candidate
+                self.sources[target] = path
+            self.targets[path] = target
+
+    def summary(self):
+        return {'files': len(self.targets), 'unique': len(self.sources), 'hashed': self.hashed, 'duplicates': self.duplicates, 'bytes_saved': self.saved_bytes}
+
+def file_sha1(f):
+    digest = hashlib.sha1()
+    for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b''): digest.update(chunk)
+    return digest.hexdigest()
+
+def print_asset_summary(summary):
+    print(f"附件去重：{summary['files']} 個附件中有 {summary['duplicates']} 個重複，保留 {summary['unique']} 份，節省 {summary['bytes_saved'] / 1024 / 1024:.1f} MB。")
+
+def process_assets(target_dir, index, error_list=None, checkpoint=None):
+    # 將附件依內容去重後移至附件資料夾；回傳 [(原始相對路徑, 附件 vault 路徑)] 供連結索引改寫連結
+    # 搬移清單先寫入續傳日誌再套用，續傳時沿用同一份清單，已完成的搬移略過
+    print("正在整理附件 (move_assets)...")
+    if checkpoint is None: checkpoint = Checkpoint()
+    full = lambda rel: os.path.join(target_dir, *rel.split('/'))
+    moves = checkpoint.find('assets', 'moves')
+    resumed = moves is not None
+    if resumed: summary = checkpoint.find('assets', 'summary')
+    else:
+        current = {rel: origin for origin, rel in index.origins()}
+        def digest(rel):
+            with open(full(rel), 'rb') as f: return file_sha1(f)
+        files = [(rel, os.path.getsize(full(rel)) if rel.lower().endswith(ASSET_EXTENSIONS) else 0, None) for rel in current]
+        plan = AssetPlan(files, digest, max(SETTINGS['workers'], SETTINGS['io_threads']))
+        moves = [(current[rel], rel, target, plan.sources[target] == rel) for rel, target in plan.targets.items()]
+        summary = plan.summary()
+        checkpoint.log('assets', moves=moves, summary=summary)
+    if moves:
+        folder = full(SETTINGS['attachments_folder'].strip('/'))
+        os.makedirs(folder, exist_ok=True)
+        index.add_dir(folder)
+    pairs = []
+    emptied = set()
+    total = len(moves)
+    print_progress(0, total, prefix='進度:', suffix='完成', length=40)
+    for i, (origin, rel, target, keep) in enumerate(moves):
+        src = full(rel)
+        try:
+            if target != rel:
+                try:
+                    if keep: os.rename(src, full(target))
+                    else: os.remove(src)
+                except FileNotFoundError:
+                    if not resumed: raise  # 續傳時代表中斷前已搬移
+                index.remove_file(src)
+                emptied.add(os.path.dirname(src))
+            if keep: index.add_file(full(target), origin)
+            pairs.append((origin, target))
+        except OSError as e:
+            if error_list is not None: error_list.append(f"[附件失敗] {rel}: {e}")
+        STATS.add_file('assets', rel)
+        print_progress(i + 1, total, prefix='進度:', suffix='完成', length=40)
+    # 移除因附件移出而變空的資料夾
+    for dirpath in sorted(emptied, key=len, reverse=True):
+        while dirpath != target_dir and os.path.isdir(dirpath) and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+            index.remove_dir(dirpath)
+            dirpath = os.path.dirname(dirpath)
+    STATS.assets = summary
+    print_asset_summary(summary)
+    return pairs
+
+def deflate_file(path, level):
+    # 於背景執行緒讀取並壓縮 (zlib 壓縮時會釋放 GIL)；回傳 (原始大小, CRC, 原始 deflate 資料)
+    with open(path, 'rb') as f: data = f.read()
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return len(data), zlib.crc32(data), compressor.compress(data) + compressor.flush()
+
+# zipfile 沒有寫入已壓縮資料的公開 API，write_deflated 依 ZipFile.mkdir 的步驟操作內部狀態
+# 只在已驗證內部結構相同的版本 (3.7–3.13) 使用，其餘版本改以 ZipFile.write 逐一壓縮
+RAW_ZIP_WRITE_VERSIONS = ((3, 7), (3, 14))
+RAW_ZIP_WRITE_ATTRS = ('_lock', '_writecheck', '_didModify', '_writing', '_seekable', 'fp', 'filelist', 'NameToInfo', 'start_dir')
+
+def raw_zip_write_supported(zipf):
+    low, high = RAW_ZIP_WRITE_VERSIONS
+    return low <= sys.version_info[:2] < high and all(hasattr(zipf, name) for name in RAW_ZIP_WRITE_ATTRS)
+
+def write_deflated(zipf, zinfo, result):
+    # 將已壓縮好的資料直接寫入 ZIP，本機檔頭與中央目錄的內容與 ZipFile.write 相同
+    file_size, crc, data = result
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    zinfo.file_size = file_size
+    zinfo.compress_size = len(data)
+    zinfo.CRC = crc
+    with zipf._lock:
+        if zipf._writing: raise ValueError("ZIP 中仍有開啟中的寫入")
+        if zipf._seekable: zipf.fp.seek(zipf.start_dir)
+        zinfo.header_offset = zipf.fp.tell()
+        zipf._writecheck(zinfo)
+        zipf._didModify = True
+        zipf.fp.write(zinfo.FileHeader())
+        zipf.fp.write(data)
+        zipf.filelist.append(zinfo)
+        zipf.NameToInfo[zinfo.filename] = zinfo
+        zipf.start_dir = zipf.fp.tell()
+
+def compress_folder_to_zip(folder_path, index=None, workers=1, level=6):
+    # 已壓縮的媒體以 STORED 存放；文字檔在 workers > 1 時由執行緒平行壓縮，依原順序寫入 (不支援的 Python 版本改為逐一壓縮)
     base_name = folder_path
     zip_filename = base_name + ".zip"
-    total_files = 0
-    for root, dirs, files in os.walk(folder_path): total_files += len(files)
+    level = min(9, max(0, level))
+    if index is None: index = FileIndex(folder_path)
+    manifest_path = os.path.join(folder_path, MANIFEST_FILE)
+    files = [f for f in index.files() if f != manifest_path]
+    total_files = len(files)
     print_progress(0, total_files, prefix='壓縮:', suffix='完成', length=40)
-    current_count = 0
-    with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, folder_path)
-                zipf.write(file_path, arcname)
-                current_count += 1
-                print_progress(current_count, total_files, prefix='壓縮:', suffix='完成', length=40)
+    ahead = max(1, workers) * 4  # 同時在記憶體中的壓縮結果上限
+    with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as zipf, ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        parallel = workers > 1 and level > 0 and raw_zip_write_supported(zipf)
+        def submit(i):
+            path = files[i]
+            if parallel and not path.lower().endswith(STORE_EXTENSIONS) and os.path.getsize(path) <= PARALLEL_DEFLATE_LIMIT:
+                return executor.submit(deflate_file, path, level)
+            return None
+        futures = {i: submit(i) for i in range(min(ahead, total_files))}
+        for i, file_path in enumerate(files):
+            if i + ahead < total_files: futures[i + ahead] = submit(i + ahead)
+            future = futures.pop(i)
+            arcname = os.path.relpath(file_path, folder_path)
+            if future is not None:
+                zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+                write_deflated(zipf, zinfo, future.result())
+            else:
+                store = level == 0 or file_path.lower().endswith(STORE_EXTENSIONS)
+                zipf.write(file_path, arcname, compress_type=zipfile.ZIP_STORED if store else zipfile.ZIP_DEFLATED)
+                zinfo = zipf.getinfo(arcname.replace(os.sep, '/'))
+            STATS.add_file('compress', arcname, zinfo.file_size)
+            print_progress(i + 1, total_files, prefix='壓縮:', suffix='完成', length=40)
     return zip_filename
 
 def open_file_explorer(path):
@@ -293,75 +1977,477 @@ def open_file_explorer(path):
     elif platform.system() == "Darwin": subprocess.Popen(["open", path])
     else: subprocess.Popen(["xdg-open", path])
 
-def main():
-    load_settings()
-    target_dir = select_and_extract_zip()
-    if not target_dir: return
-    error_log = []
+# 有暫存檔未能取代原檔的續傳日誌，轉換完成後仍保留供 --resume 重試
+KEEP_CHECKPOINTS = set()
 
-    # 1. 重命名 (去除 ID)
-    process_renaming(target_dir)
+class Checkpoint:
+    # 可續傳的轉換日誌 (JSON Lines)：記錄各階段的計畫、已完成的階段與檔案，--resume 時略過已完成的工作
+    # 階段與計畫記錄立即 fsync；檔案記錄先寫入緩衝，每 CHECKPOINT_BATCH 筆或呼叫 sync() 時才 fsync
+    # path 為 None 時停用，不寫入任何記錄
+    def __init__(self, path=None, resume=False, header=None):
+        self.path = path
+        self.records = {}
+        self.resumed = False
+        self.pending = 0
+        self.file = None
+        if path is None: return
+        if resume:
+            if os.path.exists(path): self._load()
+            else: print("找不到續傳日誌，將完整轉換。")
+            if self.records and self.records.get('start') != [header]:
+                print("續傳日誌與目前的 ZIP 或設定不符，將完整轉換。")
+                self.records = {}
+            self.resumed = bool(self.records)
+        self.file = open(path, 'a' if self.resumed else 'w', encoding='utf-8')
+        if not self.resumed: self.log('start', **header)
 
-    # 2. 智慧合併 CSV
-    handle_smart_merge_csv(target_dir)
+    def _load(self):
+        # 只讀取完整的行；中斷時寫入一半的最後一行截去後再續寫
+        valid = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'): break
+                try: record = json.loads(line)
+                except ValueError: break
+                self.records.setdefault(record.pop('stage'), []).append(record)
+                valid += len(line)
+        with open(self.path, 'r+b') as f: f.truncate(valid)
+
+    @property
+    def enabled(self): return self.file is not None
+
+    def log(self, stage, sync=True, **data):
+        if self.file is None: return
+        self.records.setdefault(stage, []).append(data)
+        self.file.write(json.dumps({'stage': stage, **data}, ensure_ascii=False) + '\n')
+        self.pending += 1
+        if sync or self.pending >= CHECKPOINT_BATCH: self.sync()
+
+    def sync(self):
+        if self.file is None or not self.pending: return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+
+    def finish(self, stage, **data): self.log(stage, done=True, **data)
+
+    def done(self, stage):
+        return next((record for record in self.records.get(stage, ()) if record.get('done')), None)
+
+    def find(self, stage, key):
+        return next((record[key] for record in self.records.get(stage, ()) if key in record), None)
+
+    def files(self, stage):
+        return {record['file']: record for record in self.records.get(stage, ()) if 'file' in record}
+
+    def close(self):
+        if self.file is None: return
+        self.sync()
+        self.file.close()
+        self.file = None
+
+def checkpoint_path(target_dir):
+    return os.path.join(os.path.dirname(target_dir), CHECKPOINT_FILE)
+
+def open_checkpoint(zip_path, target_dir, resume=False):
+    if not SETTINGS['checkpoint']: return Checkpoint()
+    header = {'zip_path': os.path.abspath(zip_path), 'target_dir': os.path.abspath(target_dir), 'settings': {k: SETTINGS[k] for k in MANIFEST_SETTINGS}}
+    KEEP_CHECKPOINTS.discard(checkpoint_path(target_dir))
+    return Checkpoint(checkpoint_path(target_dir), resume, header)
+
+def remove_checkpoint(target_dir):
+    # 轉換與打包都完成後才刪除續傳日誌
+    path = checkpoint_path(target_dir)
+    if path in KEEP_CHECKPOINTS:
+        KEEP_CHECKPOINTS.discard(path)
+        print(f"部分筆記無法取代原檔，已保留續傳日誌 {path}；關閉佔用的程式後以 --resume 重試。")
+        return
+    try: os.remove(path)
+    except FileNotFoundError: pass
+
+def convert_csv_files(target_dir, index, error_log, checkpoint=None):
+    # CSV 轉換會附加內容到既有筆記：開始前先記錄每篇筆記的原始大小，續傳時截回原始大小再重新附加，不會重複附加
+    # 回傳寫入了資料列屬性的頁面 (相對路徑)，隨各 CSV 的記錄保存，續傳時一併取回
+    if checkpoint is None: checkpoint = Checkpoint()
+    csv_files = index.files('.csv')
+    rel = lambda path: os.path.relpath(path, target_dir).replace(os.sep, '/')
+    md_of = lambda path: os.path.splitext(path)[0] + ".md"
+    sizes = checkpoint.find('csv_to_md', 'sizes')
+    resumed = sizes is not None
+    if not resumed and checkpoint.enabled:
+        sizes = {rel(p): os.path.getsize(md_of(p)) if index.exists(md_of(p)) else -1 for p in csv_files}
+        checkpoint.log('csv_to_md', sizes=sizes)
+    done = checkpoint.files('csv_to_md')
+    # 已轉換的 CSV 可能已被刪除 (delete_source_csv)，錯誤與寫入屬性的頁面由所有記錄取回
+    row_pages = []
+    for record in done.values():
+        error_log.extend(record['errors'])
+        row_pages.extend(record.get('pages', ()))
 
-    # 3. 轉換 CSV 為 MD
-    print("步驟 2/4: 轉換 Database 表格...")
-    csv_files = []
-    for dirpath, dirnames, filenames in os.walk(target_dir):
-        for name in filenames:
-            if name.endswith('.csv'): csv_files.append(os.path.join(dirpath, name))
-    
     total_csv = len(csv_files)
     print_progress(0, total_csv, prefix='進度:', suffix='完成', length=40)
     for i, csv_path in enumerate(csv_files):
-        convert_csv_to_md(csv_path, error_log)
+        record = done.get(rel(csv_path))
+        if record is not None:
+            print_progress(i + 1, total_csv, prefix='進度:', suffix='完成', length=40)
+            continue
+        if resumed and rel(csv_path) in sizes:
+            md_path = md_of(csv_path)
+            size = sizes[rel(csv_path)]
+            if size < 0 and os.path.exists(md_path): os.remove(md_path); index.remove_file(md_path)
+            elif size >= 0 and os.path.getsize(md_path) > size:
+                with open(md_path, 'r+b') as f: f.truncate(size)
+        start_errors = len(error_log)
+        nbytes = os.path.getsize(csv_path)
+        pages = []
+        start = time.perf_counter()
+        convert_csv_to_md(csv_path, error_log, index, pages)
+        STATS.add_file('csv_to_md', csv_path, nbytes, time.perf_counter() - start)
+        pages = [rel(path) for path in pages]
+        row_pages.extend(pages)
+        checkpoint.log('csv_to_md', sync=False, file=rel(csv_path), errors=error_log[start_errors:], pages=pages)
         print_progress(i + 1, total_csv, prefix='進度:', suffix='完成', length=40)
+    return sorted(set(row_pages))
+
+def convert_extracted_folder(target_dir, error_log, index=None, checkpoint=None):
+    # 所有步驟共用同一份檔案索引；checkpoint 記錄已完成的階段，續傳時略過
+    if index is None: index = FileIndex(target_dir)
+    if checkpoint is None: checkpoint = Checkpoint()
+
+    def run_stage(name, func):
+        # 已完成的階段只取回結果與錯誤，不再執行
+        record = checkpoint.done(name)
+        if record is not None:
+            error_log.extend(record['errors'])
+            return record['result']
+        start = len(error_log)
+        with STATS.stage(name): result = func()
+        checkpoint.finish(name, result=result, errors=error_log[start:])
+        return result
+
+    # 1. 重命名 (去除 ID)
+    def rename(): process_renaming(target_dir, index, error_log, checkpoint)
+    run_stage('rename', rename)
+    if checkpoint.resumed and os.path.exists(rename_plan_path(target_dir)): restore_origins(index, RenamePlan.load(rename_plan_path(target_dir)))
+
+    # 附件去重：移至附件資料夾，重複的附件只保留一份
+    asset_links = []
+    if SETTINGS['move_assets']:
+        asset_links = run_stage('assets', lambda: process_assets(target_dir, index, error_log, checkpoint))
+        if STATS.assets is None: STATS.assets = checkpoint.find('assets', 'summary')
+
+    # 連結索引：在合併與轉換 CSV 前記錄每個原始路徑的最終位置
+    pairs = run_stage('link_index', lambda: list(itertools.chain(index.origins(), asset_links)))
+    link_index = LinkIndex(target_dir, pairs)
+
+    # 2. 智慧合併 CSV
+    run_stage('merge_csv', lambda: handle_smart_merge_csv(target_dir, index))
+
+    # 3. 轉換 CSV 為 MD
+    print("步驟 2/4: 轉換 Database 表格...")
+    row_pages = run_stage('csv_to_md', lambda: convert_csv_files(target_dir, index, error_log, checkpoint)) or []
 
     # 4. 修復內容
     print("步驟 3/4: 修復表格、連結、Tags、Properties 與格式...")
-    md_files = []
-    for dirpath, dirnames, filenames in os.walk(target_dir):
-        for name in filenames:
-            if name.endswith('.md'): md_files.append(os.path.join(dirpath, name))
-                
-    total_md = len(md_files)
-    processed_count = 0
-    print_progress(0, total_md, prefix='進度:', suffix='完成', length=40)
-    
-    for i, file_path in enumerate(md_files):
+    if checkpoint.resumed: recover_staged(target_dir, index, checkpoint, error_log)
+    md_files = index.files('.md')
+
+    with STATS.stage('clean_content'): return process_markdown_files(md_files, error_log, SETTINGS['workers'], link_index, checkpoint, row_pages)
+
+def run_conversion(zip_path, target_dir, error_log, resume=False):
+    # 步驟 1-3；ZIP 無效、磁碟空間不足 (原因記錄於 error_log) 或使用者取消時回傳 None，否則回傳 (修改的筆記數, 檔案索引)
+    # 增量轉換需要比對 ZIP 成員，一律使用串流管線；串流模式的續傳即以中途儲存的轉換清單進行增量轉換
+    if SETTINGS['incremental']: SETTINGS['stream_convert'] = True
+    # 續傳日誌與改名計畫位於輸出資料夾的上一層，--out 指定的路徑尚未建立時先建立
+    os.makedirs(os.path.dirname(os.path.abspath(target_dir)), exist_ok=True)
+    if SETTINGS['stream_convert']:
+        print("步驟 1-3/4: 串流轉換 ZIP 至 Vault (不預先解壓縮)...")
+        with STATS.stage('stream'), io_gate(): processed_count = stream_zip_to_vault(zip_path, target_dir, error_log, SETTINGS['incremental'] or resume)
+        if processed_count is None: return None
+        index = None
+    else:
+        checkpoint = open_checkpoint(zip_path, target_dir, resume)
         try:
-            with open(file_path, 'r', encoding='utf-8') as f: content = f.read()
-            new_content = clean_content(content)
-            if new_content != content:
-                with open(file_path, 'w', encoding='utf-8') as f: f.write(new_content)
-                processed_count += 1
-        except Exception as e: error_log.append(f"[筆記失敗] {os.path.basename(file_path)}: {e}")
-        print_progress(i + 1, total_md, prefix='進度:', suffix='完成', length=40)
+            if checkpoint.done('extract'):
+                print(f"續傳：沿用已解壓縮的資料夾 {target_dir}")
+                index = FileIndex(target_dir)
+            else:
+                with STATS.stage('extract'), io_gate(): index = extract_zip(zip_path, target_dir, error_log)
+                if index is None: return None
+                checkpoint.finish('extract')
+            processed_count = convert_extracted_folder(target_dir, error_log, index, checkpoint)
+        finally: checkpoint.close()
+    if STATS.dangling_count:
+        print(f"\n發現 {STATS.dangling_count} 個失效的內部連結 (目標檔案不存在)" + ("，明細記錄於 conversion_report.json。" if SETTINGS['write_report'] else "。"))
+    return processed_count, index
 
-    print("-" * 40)
-    print(f"✅ 轉換成功！共修改了 {processed_count} 篇筆記。")
+def print_error_report(error_log):
+    print("\n" + "="*20 + " ⚠️ 轉換異常報告 " + "="*20)
+    for err in error_log: print(err)
+    print("="*56 + "\n")
 
-    if error_log:
-        print("\n" + "="*20 + " ⚠️ 轉換異常報告 " + "="*20)
-        for err in error_log: print(err)
-        print("="*56 + "\n")
-        if messagebox.askyesno("轉換報告", f"共有 {len(error_log)} 個錯誤。是否儲存日誌 (conversion_error_log.txt)？"):
-            parent_dir = os.path.dirname(target_dir)
-            log_path = os.path.join(parent_dir, "conversion_error_log.txt")
-            with open(log_path, "w", encoding="utf-8") as f:
-                f.write("=== Notion to Obsidian Conversion Error Log ===\n")
-                f.write("\n".join(error_log))
-            print(f"已儲存錯誤日誌至: {log_path}")
+def write_error_log(target_dir, error_log):
+    parent_dir = os.path.dirname(target_dir)
+    log_path = os.path.join(parent_dir, "conversion_error_log.txt")
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write("=== Notion to Obsidian Conversion Error Log ===\n")
+        f.write("\n".join(error_log))
+    print(f"已儲存錯誤日誌至: {log_path}")
+    return log_path
 
-    # 5. 根據新設定執行後續動作
-    zip_generated_path = None
+def start_profiler():
+    if not SETTINGS['profile']: return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+def write_report(target_dir, result, profiler=None):
+    # 效能報告與錯誤日誌放在同一資料夾；cProfile 僅涵蓋主行程
+    parent_dir = os.path.dirname(target_dir)
+    if profiler is not None:
+        profiler.disable()
+        profile_path = os.path.join(parent_dir, "conversion_profile.prof")
+        profiler.dump_stats(profile_path)
+        print(f"已儲存 cProfile 資料至: {profile_path}")
+    if not SETTINGS['write_report']: return None
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'zip_path': result['zip_path'],
+        'target_dir': target_dir,
+        'processed_count': result['processed_count'],
+        'error_count': len(result['errors']),
+        'output_zip': result['output_zip'],
+        'settings': dict(SETTINGS),
+    }
+    report.update(STATS.report())
+    report_path = os.path.join(parent_dir, "conversion_report.json")
+    with open(report_path, "w", encoding="utf-8") as f: json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"已儲存效能報告至: {report_path}")
+    return report_path
+
+def package_vault(target_dir, index=None):
     if SETTINGS['auto_zip']:
         print("\n步驟 4/4: 重新打包為 ZIP...")
-        zip_generated_path = compress_folder_to_zip(target_dir)
+        with STATS.stage('compress'), io_gate(): zip_generated_path = compress_folder_to_zip(target_dir, index, SETTINGS['workers'], SETTINGS['zip_level'])
         print(f"已建立壓縮檔: {zip_generated_path}")
+        return zip_generated_path
+    print("\n步驟 4/4: 跳過壓縮步驟。")
+    return None
+
+def convert(zip_path, out_dir=None, settings=None, config_file=CONFIG_FILE, resume=False):
+    # 無介面的轉換入口 (CLI、排程與行程池皆可呼叫)，設定來源為 config.ini 再套用 settings 覆寫
+    load_settings(config_file)
+    if settings: apply_settings(settings)
+    target_dir = os.path.abspath(out_dir) if out_dir else get_extract_path(os.path.abspath(zip_path))
+    result = {'zip_path': zip_path, 'target_dir': target_dir, 'processed_count': 0, 'errors': [], 'log_path': None, 'output_zip': None, 'report_path': None}
+    error_log = result['errors']
+    STATS.reset()
+    profiler = start_profiler()
+    converted = run_conversion(zip_path, target_dir, error_log, resume)
+    if converted is None:
+        # 失敗原因已由解壓縮 / 串流步驟記錄於 error_log
+        if profiler is not None: profiler.disable()
+        return result
+    processed_count, index = converted
+    result['processed_count'] = processed_count
+    print("-" * 40)
+    print(f"✅ 轉換完成！共修改了 {processed_count} 篇筆記。")
+    if error_log:
+        print_error_report(error_log)
+        result['log_path'] = write_error_log(target_dir, error_log)
+    result['output_zip'] = package_vault(target_dir, index)
+    remove_checkpoint(target_dir)
+    result['report_path'] = write_report(target_dir, result, profiler)
+    return result
+
+def collect_batch_zips(sources):
+    # 資料夾展開為其中的 ZIP 檔 (不含子資料夾與先前輸出的 *_Obsidian_Ready.zip)；依大小由大到小排序，最大的匯出最先開始
+    zips = []
+    for source in sources:
+        if os.path.isdir(source):
+            zips += [os.path.join(source, name) for name in sorted(os.listdir(source)) if name.lower().endswith('.zip') and not name.endswith('_Obsidian_Ready.zip') and os.path.isfile(os.path.join(source, name))]
+        elif os.path.isfile(source): zips.append(source)
+        else: raise ValueError(f"找不到 ZIP 檔或資料夾: {source}")
+    zips = list(dict.fromkeys(os.path.abspath(path) for path in zips))
+    return sorted(zips, key=os.path.getsize, reverse=True)
+
+def batch_targets(zips, root):
+    # 每個匯出使用各自的子資料夾，改名計畫、續傳日誌、錯誤日誌與報告才不會互相覆蓋；同名的 ZIP 依序加上 " (2)" 後綴
+    targets = []
+    used = set()
+    for zip_path in zips:
+        stem = os.path.splitext(os.path.basename(zip_path))[0]
+        name, n = stem, 1
+        while name.lower() in used:
+            n += 1
+            name = f"{stem} ({n})"
+        used.add(name.lower())
+        targets.append(os.path.join(root, name, f"{stem}_Obsidian_Ready"))
+    return targets
+
+def _init_batch_worker(gate):
+    global IO_GATE
+    IO_GATE = gate
+
+def _batch_job(zip_path, target_dir, settings, config_file, resume):
+    # 在批次子行程中轉換單一匯出；主控台輸出寫入各自的 conversion_output.log，例外記為該匯出的錯誤而不中斷批次
+    os.makedirs(os.path.dirname(target_dir), exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(os.path.dirname(target_dir), BATCH_OUTPUT_LOG), 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        try: result = convert(zip_path, target_dir, settings, config_file, resume)
+        except Exception as e:
+            print(f"轉換中止: {e!r}")
+            result = {'zip_path': zip_path, 'target_dir': target_dir, 'processed_count': 0, 'errors': [f"[批次失敗] {os.path.basename(zip_path)}: {e}"], 'log_path': None, 'output_zip': None, 'report_path': None}
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+def run_batch(sources, out_dir=None, settings=None, config_file=CONFIG_FILE, resume=False):
+    # 同時轉換多個匯出：共用 workers 行程總數 (未指定時為 CPU 核心數)，batch_jobs 個匯出同時進行，各分得 workers // batch_jobs 個步驟 3 行程
+    # 解壓縮、串流轉換與打包以跨行程號誌限制為最多 batch_io_jobs 個同時進行；回傳彙總結果，找不到 ZIP 時回傳 None
+    load_settings(config_file)
+    settings = dict(settings or {})
+    apply_settings(settings)
+    zips = collect_batch_zips(sources)
+    if not zips: print("找不到任何 ZIP 檔。"); return None
+    if out_dir: root = os.path.abspath(out_dir)
     else:
-        print("\n步驟 4/4: 跳過壓縮步驟。")
+        try: root = os.path.join(os.path.commonpath([os.path.dirname(path) for path in zips]), BATCH_FOLDER)
+        except ValueError: root = os.path.abspath(BATCH_FOLDER)  # Windows 上位於不同磁碟機
+    budget = SETTINGS['workers'] if 'workers' in settings else (os.cpu_count() or 1)
+    jobs = min(len(zips), SETTINGS['batch_jobs'] or budget)
+    io_jobs = max(1, SETTINGS['batch_io_jobs'])
+    settings['workers'] = max(1, budget // jobs)
+    targets = batch_targets(zips, root)
+    print(f"批次轉換 {len(zips)} 個匯出至: {root}")
+    print(f"同時轉換 {jobs} 個匯出，每個使用 {settings['workers']} 個行程，最多 {io_jobs} 個同時解壓縮 / 打包。")
+    os.makedirs(root, exist_ok=True)
+    start = time.perf_counter()
+    results = [None] * len(zips)
+    ctx = multiprocessing.get_context()
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx, initializer=_init_batch_worker, initargs=(ctx.BoundedSemaphore(io_jobs),)) as executor:
+        # 依大小順序送出，行程池依序取出，大型匯出最先開始、小型匯出填補後段的空檔
+        futures = {executor.submit(_batch_job, zip_path, target, settings, config_file, resume): i for i, (zip_path, target) in enumerate(zip(zips, targets))}
+        for n, future in enumerate(as_completed(futures), 1):
+            result = results[futures[future]] = future.result()
+            print(f"[{n}/{len(zips)}] {os.path.basename(result['zip_path'])}: 修改 {result['processed_count']} 篇筆記，{len(result['errors'])} 個錯誤 ({result['seconds']:.1f}s)")
+
+    errors = [f"[{os.path.basename(result['zip_path'])}] {error}" for result in results for error in result['errors']]
+    summary = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'root': root,
+        'seconds': round(time.perf_counter() - start, 3),
+        'jobs': jobs,
+        'workers_per_job': settings['workers'],
+        'io_jobs': io_jobs,
+        'exports': len(results),
+        'processed_count': sum(result['processed_count'] for result in results),
+        'error_count': len(errors),
+        'results': [dict({key: result[key] for key in ('zip_path', 'target_dir', 'processed_count', 'output_zip', 'log_path', 'report_path', 'seconds')}, error_count=len(result['errors'])) for result in results],
+        'error_log': None,
+    }
+    print("-" * 40)
+    print(f"✅ 批次轉換完成！{summary['exports']} 個匯出共修改了 {summary['processed_count']} 篇筆記，耗時 {summary['seconds']:.1f}s。")
+    if errors:
+        summary['error_log'] = os.path.join(root, BATCH_ERROR_LOG)
+        with open(summary['error_log'], "w", encoding="utf-8") as f:
+            f.write("=== Notion to Obsidian Batch Error Log ===\n")
+            f.write("\n".join(errors))
+        print(f"共有 {len(errors)} 個錯誤，已儲存錯誤日誌至: {summary['error_log']}")
+    with open(os.path.join(root, BATCH_SUMMARY_FILE), "w", encoding="utf-8") as f: json.dump(summary, f, ensure_ascii=False, indent=2)
+    print(f"已儲存批次報告至: {os.path.join(root, BATCH_SUMMARY_FILE)}")
+    return summary
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Notion to Obsidian 批量轉換工具")
+    parser.add_argument('zip', nargs='?', default=None, help="Notion 匯出的 ZIP 檔；省略時開啟圖形介面選擇檔案")
+    parser.add_argument('--config', default=CONFIG_FILE, help="設定檔路徑 (預設為 config.ini)")
+    parser.add_argument('--workers', type=int, default=None, help="步驟 3 平行處理的行程數 (預設讀取 config.ini，1 為單核心)")
+    parser.add_argument('--io-threads', type=int, default=None, help="重疊檔案 I/O 的執行緒數，適用於網路磁碟 (預設讀取 config.ini，1 為不重疊)")
+    parser.add_argument('--stream', action='store_true', help="直接從 ZIP 串流轉換，不預先解壓縮")
+    parser.add_argument('--incremental', action='store_true', help="依上次的轉換清單只轉換新增或變更的頁面 (使用串流模式)")
+    parser.add_argument('--out', default=None, help="輸出資料夾 (預設為 ZIP 旁的 <名稱>_Obsidian_Ready)")
+    parser.add_argument('--no-zip', action='store_true', help="轉換後不重新打包為 ZIP")
+    parser.add_argument('--profile', action='store_true', help="以 cProfile 記錄主行程並輸出 conversion_profile.prof")
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE', help="覆寫任一設定項目，例如 --set enable_yaml=False (可重複)")
+    parser.add_argument('--batch', nargs='+', default=None, metavar='PATH', help="批次轉換多個 ZIP 檔或資料夾中的所有 ZIP 檔，--out 為批次輸出資料夾")
+    parser.add_argument('--jobs', type=int, default=None, help="批次轉換時同時進行的匯出數 (預設讀取 config.ini，0 為依行程數自動決定)")
+    parser.add_argument('--io-jobs', type=int, default=None, help="批次轉換時同時解壓縮 / 打包的匯出數上限 (預設讀取 config.ini)")
+    parser.add_argument('--resume', action='store_true', help="從中斷處繼續上次的轉換 (依 conversion_checkpoint.jsonl 略過已完成的工作)")
+    parser.add_argument('--undo-renames', default=None, metavar='PLAN', help="依 conversion_rename_plan.json 還原轉換時的改名")
+    return parser.parse_args(argv)
+
+def cli_settings(args):
+    overrides = {}
+    for item in args.set:
+        key, sep, value = item.partition('=')
+        if not sep: raise ValueError(f"--set 格式應為 KEY=VALUE: {item}")
+        overrides[key.strip()] = value.strip()
+    if args.workers: overrides['workers'] = max(1, args.workers)
+    if args.io_threads: overrides['io_threads'] = max(1, args.io_threads)
+    if args.jobs: overrides['batch_jobs'] = max(1, args.jobs)
+    if args.io_jobs: overrides['batch_io_jobs'] = max(1, args.io_jobs)
+    if args.stream: overrides['stream_convert'] = True
+    if args.incremental: overrides['incremental'] = True
+    if args.no_zip: overrides['auto_zip'] = False
+    if args.profile: overrides['profile'] = True
+    return overrides
+
+def main(args=None):
+    # 指定 ZIP 檔時以無介面模式執行，結束代碼：0 = 成功、1 = 有錯誤、2 = 參數錯誤
+    # 圖形介面模式的錯誤已於視窗中回報，與原本相同結束代碼為 0 (run.bat 以非 0 判斷程式無法執行)
+    if args is None: args = parse_args([])
+    try: overrides = cli_settings(args)
+    except ValueError as e: print(f"參數錯誤: {e}"); return 2
+    if args.undo_renames:
+        if not os.path.isfile(args.undo_renames): print(f"找不到改名計畫: {args.undo_renames}"); return 2
+        restored, skipped, errors = undo_renames(args.undo_renames)
+        for error in errors: print(error)
+        print(f"已還原 {restored} 個名稱，略過 {skipped} 個已不存在的項目，失敗 {len(errors)} 個。")
+        return 1 if errors else 0
+    if args.batch:
+        try: summary = run_batch(args.batch, args.out, overrides, args.config, args.resume)
+        except ValueError as e: print(f"參數錯誤: {e}"); return 2
+        if summary is None: return 2
+        return 1 if summary['error_count'] else 0
+    if args.zip:
+        if not os.path.isfile(args.zip): print(f"找不到 ZIP 檔: {args.zip}"); return 2
+        try: result = convert(args.zip, args.out, overrides, args.config, args.resume)
+        except ValueError as e: print(f"參數錯誤: {e}"); return 2
+        return 1 if result['errors'] else 0
+    return run_gui(args, overrides)
+
+def run_gui(args, overrides):
+    global GUI_MODE
+    GUI_MODE = True
+    load_settings(args.config)
+    try: apply_settings(overrides)
+    except ValueError as e: show_message("錯誤", str(e), error=True); return 2
+    error_log = []
+
+    zip_path = select_zip_file()
+    if not zip_path: return 0
+    target_dir = os.path.abspath(args.out) if args.out else get_extract_path(zip_path)
+    STATS.reset()
+    profiler = start_profiler()
+    # --resume 未指定 ZIP 時 (run.bat) 以選取的 ZIP 與輸出資料夾續傳
+    converted = run_conversion(zip_path, target_dir, error_log, args.resume)
+    if converted is None:
+        if profiler is not None: profiler.disable()
+        return 0
+    processed_count, index = converted
+
+    print("-" * 40)
+    print(f"✅ 轉換成功！共修改了 {processed_count} 篇筆記。")
+
+    if error_log:
+        print_error_report(error_log)
+        if ask_yes_no("轉換報告", f"共有 {len(error_log)} 個錯誤。是否儲存日誌 (conversion_error_log.txt)？"):
+            write_error_log(target_dir, error_log)
+
+    # 5. 根據新設定執行後續動作
+    zip_generated_path = package_vault(target_dir, index)
+    remove_checkpoint(target_dir)
+    write_report(target_dir, {'zip_path': zip_path, 'processed_count': processed_count, 'errors': error_log, 'output_zip': zip_generated_path}, profiler)
 
     if SETTINGS['open_folder']:
         parent_dir = os.path.dirname(target_dir)
@@ -374,7 +2460,8 @@ def main():
     if SETTINGS['open_folder']:
         msg += "\n\n已為您開啟檔案位置。"
         
-    messagebox.showinfo("完成", msg)
+    show_message("完成", msg)
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main(parse_args()))
\ No newline at end of file